@@ -1,49 +1,45 @@
 import os
-import requests
 import re
+import json
+import base64
+import gzip
+import hashlib
+import bisect
+import mimetypes
+import tempfile
+import threading
 import urllib.parse
 import time
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, send_file, Response
-from difflib import get_close_matches, SequenceMatcher  # For string similarity
-from PIL import Image  # For image processing
+from flask import Flask, render_template, request, redirect, url_for, send_from_directory, Response, jsonify, g
+from collections import OrderedDict
 from datetime import datetime  # For handling dates and times
 from urllib.parse import unquote
-
-# SMB-safe directory listing helper
-def safe_listdir(path: str, retries: int = 8, base_delay: float = 0.05):
-    """
-    Safely list directory contents with retry logic for SMB mounts.
-    Degrades gracefully on BlockingIOError instead of raising 500 errors.
-    """
-    last_exc = None
-    for attempt in range(retries):
-        try:
-            return os.listdir(path)
-        except BlockingIOError as e:
-            last_exc = e
-            time.sleep(base_delay * (2 ** attempt))
-    return []  # degrade gracefully, never 500
-
-# SMB-safe file reading helper
-def safe_send_file(path: str, retries: int = 8, base_delay: float = 0.05, **kwargs):
-    """
-    Safely send a file with retry logic for SMB mounts.
-    Handles BlockingIOError by retrying with exponential backoff.
-    """
-    last_exc = None
-    for attempt in range(retries):
-        try:
-            return send_file(path, **kwargs)
-        except BlockingIOError as e:
-            last_exc = e
-            if attempt < retries - 1:  # Don't sleep on the last attempt
-                time.sleep(base_delay * (2 ** attempt))
-    # If all retries fail, raise the last exception
-    raise last_exc
+from werkzeug.wsgi import wrap_file
+from catalog import LibraryIndex  # Persistent library index
+from scanner import LibraryScanner  # Background catalog scanner
+from tmdb import ResponseCache, TMDbClient  # Pooled, cached TMDb API client
+from jobs import JobQueue, JobConflict  # Background poster download jobs
+from batch import MissingPosterFiller  # Bulk poster filling
+from matcher import DirectoryMatcher  # Indexed title -> directory matching
+from thumbnails import write_thumbnails, remove_stale_variants, parse_variant, DEFAULT_WIDTH, MIME_TYPES  # Thumbnail ladder
+from thumbcache import ThumbnailCache, cache_key  # Local thumbnail cache in front of the NAS
+from seasons import save_season_posters, season_poster_name  # Season artwork for TV shows
+import metrics  # Prometheus-style timings and counters for /metrics
+from smbio import NASClient, MountUnavailable  # NAS I/O threads, circuit breakers and cached listings
+from notify import SlackNotifier  # Batched background Slack notifications
+
+# Brotli is optional; without it responses are gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Initialize Flask application for managing movie and TV show posters
 app = Flask(__name__)
 
+# Process start time, reported by the health endpoints
+STARTED_AT = time.time()
+
 # Custom Jinja2 filter to remove year information from movie titles for cleaner display
 @app.template_filter('remove_year')
 def remove_year(value):
@@ -53,22 +49,148 @@ def remove_year(value):
 # Fetch TMDb API key from environment variables for movie/TV show metadata
 TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 
-# Base URLs for TMDb API and poster images
-BASE_URL = "https://api.themoviedb.org/3"
-POSTER_BASE_URL = "https://image.tmdb.org/t/p/original"
+# Base URLs for TMDb API and poster images (overridable, e.g. to point at a local stub server)
+BASE_URL = os.getenv('TMDB_BASE_URL', "https://api.themoviedb.org/3")
+POSTER_BASE_URL = os.getenv('TMDB_POSTER_BASE_URL', "https://image.tmdb.org/t/p/original")
+
+# Smaller TMDb image size shown on the poster selection page (the original is still what gets saved),
+# and whether those previews are proxied and cached locally through /preview/...
+POSTER_PREVIEW_SIZE = os.getenv('TMDB_POSTER_PREVIEW_SIZE', 'w342')
+POSTER_PREVIEW_BASE_URL = os.getenv('TMDB_POSTER_PREVIEW_BASE_URL', f"{POSTER_BASE_URL.rsplit('/', 1)[0]}/{POSTER_PREVIEW_SIZE}")
+POSTER_PREVIEW_PROXY = os.getenv('POSTER_PREVIEW_PROXY', 'true').lower() == 'true'
+POSTER_PREVIEW_CACHE_MB = int(os.getenv('POSTER_PREVIEW_CACHE_MB', '128'))
+
+# TMDb client settings: API calls per second, request timeout, retry count and backoff base
+TMDB_RATE_LIMIT = float(os.getenv('TMDB_RATE_LIMIT', '40'))
+TMDB_TIMEOUT = float(os.getenv('TMDB_TIMEOUT', '30'))
+TMDB_RETRIES = int(os.getenv('TMDB_RETRIES', '3'))
+TMDB_BACKOFF = float(os.getenv('TMDB_BACKOFF', '0.5'))
+
+# TMDb response cache settings: in-memory LRU size and optional on-disk store
+TMDB_CACHE_SIZE = int(os.getenv('TMDB_CACHE_SIZE', '512'))
+TMDB_CACHE_DISK = os.getenv('TMDB_CACHE_DISK', 'true').lower() == 'true'
+
+# Per-endpoint TTL overrides in seconds, e.g. TMDB_CACHE_TTLS="/search/movie=600,/movie/{id}/images=3600"
+TMDB_CACHE_TTLS = {
+    endpoint.strip(): int(ttl)
+    for endpoint, ttl in (item.split('=', 1) for item in os.getenv('TMDB_CACHE_TTLS', '').split(',') if '=' in item)
+}
 
 # Define base folders for organizing movies and TV shows
 # Environment variables allow flexible folder configuration without code changes
 movie_folders_env = os.getenv('MOVIE_FOLDERS', '/movies,/kids-movies')
 tv_folders_env = os.getenv('TV_FOLDERS', '/tv,/kids-tv')
 
-# Parse comma-separated folder lists and filter out non-existent paths
-movie_folders = [folder.strip() for folder in movie_folders_env.split(',') if folder.strip() and os.path.exists(folder.strip())]
-tv_folders = [folder.strip() for folder in tv_folders_env.split(',') if folder.strip() and os.path.exists(folder.strip())]
-
-# Log the folders being used for verification
-app.logger.info(f"Movie folders: {movie_folders}")
-app.logger.info(f"TV folders: {tv_folders}")
+# Parse comma-separated folder lists; folders that don't exist are dropped by validate_mounts()
+# on first use, so importing the app never waits on the NAS
+movie_folders = [folder.strip() for folder in movie_folders_env.split(',') if folder.strip()]
+tv_folders = [folder.strip() for folder in tv_folders_env.split(',') if folder.strip()]
+
+# Number of web worker processes sharing the state below (set by gunicorn.conf.py; 1 for the dev server)
+WEB_WORKERS = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+
+# Directory for Postarr's own state (library index database, caches)
+DATA_DIR = os.getenv('POSTARR_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Shared TMDb client (pooled connections, rate limit, retries, response cache) used by every route
+tmdb_cache = ResponseCache(
+    max_entries=TMDB_CACHE_SIZE,
+    ttls=TMDB_CACHE_TTLS,
+    db_path=os.path.join(DATA_DIR, 'tmdb_cache.db') if TMDB_CACHE_DISK else None,
+)
+tmdb_api = TMDbClient(
+    TMDB_API_KEY,
+    BASE_URL,
+    cache=tmdb_cache,
+    rate_limit=TMDB_RATE_LIMIT / WEB_WORKERS,  # Split the budget so extra workers don't multiply API calls
+    timeout=(min(5, TMDB_TIMEOUT), TMDB_TIMEOUT),
+    retries=TMDB_RETRIES,
+    backoff=TMDB_BACKOFF,
+)
+
+# Background workers for poster downloads and thumbnail generation
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+job_queue = JobQueue(workers=JOB_WORKERS, logger=app.logger, db_path=os.path.join(DATA_DIR, 'jobs.db'))
+
+# NAS I/O layer: request threads hand file calls to SMB_IO_THREADS I/O threads and wait at most SMB_TIMEOUT
+# seconds; after SMB_BREAKER_FAILURES consecutive failures a mount is skipped for SMB_BREAKER_RESET seconds,
+# and directory listings are reused (refreshed in the background after SMB_LISTING_TTL seconds)
+nas = NASClient(
+    lambda: movie_folders + tv_folders,
+    io_threads=int(os.getenv('SMB_IO_THREADS', '4')),
+    timeout=float(os.getenv('SMB_TIMEOUT', '5')),
+    queue_timeout=float(os.getenv('SMB_QUEUE_TIMEOUT', '30')),
+    retries=int(os.getenv('SMB_RETRIES', '4')),
+    failure_threshold=int(os.getenv('SMB_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('SMB_BREAKER_RESET', '30')),
+    listing_ttl=float(os.getenv('SMB_LISTING_TTL', '30')),
+    logger=app.logger,
+)
+
+# Slack notifications: saves within SLACK_BATCH_WINDOW seconds are posted as one message
+# (at most SLACK_MAX_ATTACHMENTS posters each), retried up to SLACK_RETRIES times with backoff
+SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
+slack_notifier = SlackNotifier(
+    SLACK_WEBHOOK_URL,
+    window=float(os.getenv('SLACK_BATCH_WINDOW', '10')),
+    max_attachments=int(os.getenv('SLACK_MAX_ATTACHMENTS', '20')),
+    retries=int(os.getenv('SLACK_RETRIES', '5')),
+    timeout=float(os.getenv('SLACK_TIMEOUT', '10')),
+    logger=app.logger,
+) if SLACK_WEBHOOK_URL else None
+
+# Function to check whether a configured folder exists, without letting a slow mount block startup
+def mount_exists(folder):
+    try:
+        nas.stat(folder)
+    except MountUnavailable:
+        return True  # Busy or slow isn't missing; the circuit breaker takes care of it
+    except OSError:
+        return False
+    return True
+
+# Configured folders are validated once, by the first library scan
+_mounts_checked = threading.Event()
+_mounts_lock = threading.Lock()
+
+# Function to drop configured folders that don't exist (e.g. the default /kids-movies when nothing is mounted there)
+def validate_mounts():
+    global movie_folders, tv_folders
+    with _mounts_lock:
+        if _mounts_checked.is_set():
+            return
+        movie_folders = [folder for folder in movie_folders if mount_exists(folder)]
+        tv_folders = [folder for folder in tv_folders if mount_exists(folder)]
+        _mounts_checked.set()
+
+    # Log the folders being used for verification
+    app.logger.info(f"Movie folders: {movie_folders}")
+    app.logger.info(f"TV folders: {tv_folders}")
+
+# Number of media directories probed concurrently on the NAS
+PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', '8'))
+
+# Persistent library index so page loads only re-probe directories that changed.
+# Scans always list the NAS afresh; when it doesn't answer, the indexed titles are kept
+library_index = LibraryIndex(os.path.join(DATA_DIR, 'library.db'), listdir=nas.fetch_listing,
+                             probe_workers=PROBE_WORKERS)
+
+# Local cache for thumbnails served from the NAS: THUMB_CACHE=disk|memory|off, THUMB_CACHE_MB byte budget
+THUMB_CACHE = os.getenv('THUMB_CACHE', 'disk').lower()
+THUMB_CACHE_MB = int(os.getenv('THUMB_CACHE_MB', '256'))
+if THUMB_CACHE in ('disk', 'memory'):
+    thumb_cache = ThumbnailCache(
+        THUMB_CACHE_MB * 1024 * 1024,
+        cache_dir=os.path.join(DATA_DIR, 'thumbcache') if THUMB_CACHE == 'disk' else None,
+    )
+else:
+    thumb_cache = None
+
+# Local cache for proxied TMDb previews; TMDb image paths never change content, so entries never go stale
+preview_cache = ThumbnailCache(
+    POSTER_PREVIEW_CACHE_MB * 1024 * 1024,
+    cache_dir=os.path.join(DATA_DIR, 'previews') if THUMB_CACHE == 'disk' else None,
+) if POSTER_PREVIEW_PROXY and THUMB_CACHE != 'off' else None
 
 # Function to normalize movie/TV show titles for consistent searching and comparison
 def normalize_title(title):
@@ -81,6 +203,10 @@ def strip_leading_the(title):
         return title[4:]  # Remove "The " (4 characters)
     return title
 
+# Sort key used for the library grid; also the basis of pagination cursors
+def media_sort_key(title):
+    return strip_leading_the(title.lower())
+
 # Function to generate a URL-friendly and anchor-safe ID from the media title
 def generate_clean_id(title):
     # Replace all non-alphanumeric characters with dashes and strip leading/trailing dashes
@@ -88,90 +214,413 @@ def generate_clean_id(title):
     return clean_id
 
 # Function to retrieve media directories and their associated poster thumbnails
-def get_poster_thumbnails(base_folders=None):
+def get_poster_thumbnails(base_folders=None, force=False, revalidate=True):
     # Default to movie folders if no folders specified
     if base_folders is None:
         base_folders = movie_folders
     media_list = []
 
-    # Iterate through specified base folders to find media with posters
-    for base_folder in base_folders:
-        for media_dir in sorted(safe_listdir(base_folder)):
-            if media_dir.lower() in ["@eadir", "#recycle"]:  # Skip Synology NAS system folders (case-insensitive)
-                continue
-
-            media_path = os.path.join(base_folder, media_dir)
-
-            if os.path.isdir(media_path):
-                poster = None
-                poster_thumb = None
-                poster_dimensions = None
-                poster_last_modified = None
-
-                # Search for poster files in various image formats
-                for ext in ['jpg', 'jpeg', 'png']:
-                    thumb_path = os.path.join(media_path, f"poster-thumb.{ext}")
-                    poster_path = os.path.join(media_path, f"poster.{ext}")
-
-                    # Store thumbnail and full poster paths for web serving
-                    if os.path.exists(thumb_path):
-                        poster_thumb = f"/poster/{urllib.parse.quote(media_dir)}/poster-thumb.{ext}"
-
-                    if os.path.exists(poster_path):
-                        poster = f"/poster/{urllib.parse.quote(media_dir)}/poster.{ext}"
-
-                        # Get poster image dimensions
-                        try:
-                            with Image.open(poster_path) as img:
-                                poster_dimensions = f"{img.width}x{img.height}"
-                        except Exception:
-                            poster_dimensions = "Unknown"
-
-                        # Get last modified timestamp of the poster
-                        timestamp = os.path.getmtime(poster_path)
-                        poster_last_modified = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
-                        break
-
-                # Generate a clean ID for HTML anchor and URL purposes
-                clean_id = generate_clean_id(media_dir)
-                media_list.append({
-                    'title': media_dir,
-                    'poster': poster,
-                    'poster_thumb': poster_thumb,
-                    'poster_dimensions': poster_dimensions,
-                    'poster_last_modified': poster_last_modified,
-                    'clean_id': clean_id,
-                    'has_poster': bool(poster_thumb)
-                })
+    # Bring the persistent index up to date (only changed directories are re-probed),
+    # or read it as-is when revalidate is False
+    if revalidate:
+        validate_mounts()
+        records = library_index.reconcile(base_folders, force=force)
+    else:
+        records = library_index.load(base_folders)
+
+    for record in records:
+        media_dir = record['media_dir']
+        # Directory mtime (ms) versions the poster URLs, so a new poster gets a new URL
+        version = int(record['dir_mtime'] * 1000)
+        poster = None
+        poster_thumb = None
+        poster_dimensions = None
+        poster_last_modified = None
+
+        # Store thumbnail and full poster paths for web serving
+        thumb_variants = record['thumb_variants'].split(',') if record.get('thumb_variants') else []
+        poster_srcset = None
+        if record['poster_thumb']:
+            poster_thumb = f"/poster/{urllib.parse.quote(media_dir)}/{record['poster_thumb']}?v={version}"
+
+            # Offer every generated width; serve_poster picks the best format for the browser
+            widths = sorted({parse_variant(name)[0] for name in thumb_variants})
+            if len(widths) > 1:
+                poster_srcset = ', '.join(f"{poster_thumb}&w={width} {width}w" for width in widths)
+
+        if record['poster']:
+            poster = f"/poster/{urllib.parse.quote(media_dir)}/{record['poster']}?v={version}"
+
+            # Poster image dimensions as recorded in the index
+            if record['width'] and record['height']:
+                poster_dimensions = f"{record['width']}x{record['height']}"
+            else:
+                poster_dimensions = "Unknown"
+
+            # Last modified timestamp of the poster
+            poster_last_modified = datetime.fromtimestamp(record['poster_mtime']).strftime('%Y-%m-%d')
+
+        # Season folders and season posters found in TV show folders
+        season_posters = [int(n) for n in record['season_posters'].split(',')] if record.get('season_posters') else []
+        seasons = [int(n) for n in record['seasons'].split(',')] if record.get('seasons') else []
+        seasons = sorted(set(seasons) | set(season_posters))
+
+        # Generate a clean ID for HTML anchor and URL purposes
+        clean_id = generate_clean_id(media_dir)
+        media_list.append({
+            'title': media_dir,
+            'poster': poster,
+            'poster_file': record['poster'],
+            'poster_thumb': poster_thumb,
+            'poster_dimensions': poster_dimensions,
+            'poster_last_modified': poster_last_modified,
+            'clean_id': clean_id,
+            'has_poster': bool(poster_thumb),
+            'base_folder': record['base_folder'],
+            'version': version,
+            'thumb_variants': thumb_variants,
+            'poster_srcset': poster_srcset,
+            'seasons': seasons,
+            'season_posters': season_posters
+        })
 
     # Sort media list, ignoring leading "The" for more natural sorting
-    media_list = sorted(media_list, key=lambda x: strip_leading_the(x['title'].lower()))
+    media_list = sorted(media_list, key=lambda x: (media_sort_key(x['title']), x['title']))
     return media_list, len(media_list)
 
+# Function to digest a catalog section cheaply: folder names plus their mtime versions cover
+# everything the grid shows (a new poster or thumbnail changes the folder's mtime)
+def catalog_fingerprint(entries):
+    digest = hashlib.sha1()
+    for entry in entries:
+        digest.update(f"{entry['base_folder']}\0{entry['title']}\0{entry['version']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+# Background scanner settings: seconds between scans, sections scanned in parallel, inotify on/off
+SCAN_INTERVAL = int(os.getenv('SCAN_INTERVAL', '300'))
+SCAN_CONCURRENCY = int(os.getenv('SCAN_CONCURRENCY', '2'))
+SCAN_USE_INOTIFY = os.getenv('SCAN_USE_INOTIFY', 'true').lower() == 'true'
+
+# Background scanner that keeps an immutable snapshot of the movie and TV catalogs
+library_scanner = LibraryScanner(
+    sections={
+        'movies': lambda **kwargs: get_poster_thumbnails(movie_folders, **kwargs)[0],
+        'tv': lambda **kwargs: get_poster_thumbnails(tv_folders, **kwargs)[0],
+    },
+    watch_folders=lambda: movie_folders + tv_folders,
+    interval=SCAN_INTERVAL,
+    concurrency=SCAN_CONCURRENCY,
+    use_inotify=SCAN_USE_INOTIFY,
+    logger=app.logger,
+    # Only one web worker scans the mounts; the others reload when the shared index changes
+    lock_path=os.path.join(DATA_DIR, 'scanner'),
+    changes=library_index.generation,
+    fingerprint=catalog_fingerprint,
+)
+
+# Send a Server-Timing header with the time each request spent per subsystem (SERVER_TIMING=true)
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'
+
+# Start the background scanner with the first request (works for the dev server and WSGI servers alike)
+@app.before_request
+def start_background_services():
+    library_scanner.start()
+    # Worker processes share their metrics through the data directory
+    metrics.REGISTRY.start_flushing(os.path.join(DATA_DIR, 'metrics'))
+
+# Start timing the request (and collecting per-subsystem times for Server-Timing)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_timings_token = metrics.request_timings.set({})
+
+# Record the request duration and add the Server-Timing header
+@app.after_request
+def record_request_timing(response):
+    started = g.pop('request_started', None)
+    token = g.pop('request_timings_token', None)
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    metrics.HTTP_REQUEST_SECONDS.observe(duration, endpoint=request.endpoint or 'unknown', method=request.method,
+                                         status=response.status_code)
+    if SERVER_TIMING:
+        timings = metrics.request_timings.get() or {}
+        entries = [f"{name};dur={seconds * 1000:.1f};desc=\"{count}x\"" for name, (seconds, count) in timings.items()]
+        entries.append(f"total;dur={duration * 1000:.1f}")
+        response.headers['Server-Timing'] = ', '.join(entries)
+    if token is not None:
+        metrics.request_timings.reset(token)
+    return response
+
+# Minimum body size worth compressing, and the content types that are
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript')
+
+# Compress other text responses (JSON API pages, search results, /metrics) on the fly
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# Route exposing request, NAS, TMDb, image and Slack timings in the Prometheus text format
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Number of titles per page for the library grid and its JSON API
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', '60'))
+MAX_PAGE_SIZE = 500
+
+# Function to encode/decode opaque pagination cursors (the sort key and title of the last item)
+def encode_cursor(entry):
+    raw = json.dumps([media_sort_key(entry['title']), entry['title']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        key, title = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    # Anything but two strings can't be compared with the sort keys
+    if not isinstance(key, str) or not isinstance(title, str):
+        return None
+    return key, title
+
+# Sort keys per published section. Snapshot sections are immutable tuples, so their keys are built
+# once and reused by every page request (the entries are kept alongside so their id can't be reused)
+_sort_keys = OrderedDict()
+_sort_keys_lock = threading.Lock()
+
+# Function to get the (sort key, title) pairs matching a section's grid order
+def section_sort_keys(entries):
+    with _sort_keys_lock:
+        cached = _sort_keys.get(id(entries))
+        if cached is not None and cached[0] is entries:
+            return cached[1]
+    keys = [(media_sort_key(entry['title']), entry['title']) for entry in entries]
+    with _sort_keys_lock:
+        _sort_keys[id(entries)] = (entries, keys)
+        while len(_sort_keys) > 4:  # Current and previous snapshot of both sections
+            _sort_keys.popitem(last=False)
+    return keys
+
+# Function to filter and page through a catalog section for the grid and the JSON API
+def paginate_media(entries, args):
+    """
+    Return one page of catalog entries.
+    Supported arguments: q (title filter), has_poster (true/false), starts_with (prefix jump),
+    anchor (start at a clean_id), cursor (continue after a previous page) and limit.
+    """
+    query = args.get('q', '').strip().lower()
+    has_poster = args.get('has_poster', '').lower()
+    starts_with = args.get('starts_with', '').strip().lower()
+    anchor = args.get('anchor', '')
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+    try:
+        limit = min(max(int(args.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+
+    # Apply filters; the snapshot is already sorted so the result stays in grid order
+    keys = section_sort_keys(entries)
+    if query or has_poster in ('true', 'false'):
+        wanted = has_poster == 'true'
+        matches = [(key, entry) for key, entry in zip(keys, entries)
+                   if (not query or query in entry['title'].lower())
+                   and (has_poster not in ('true', 'false') or entry['has_poster'] == wanted)]
+        keys = [key for key, _ in matches]
+        entries = [entry for _, entry in matches]
+    total = len(entries)
+
+    # Work out where this page starts
+    start = 0
+    if cursor is not None:
+        start = bisect.bisect_right(keys, tuple(cursor))
+    elif anchor:
+        start = next((i for i, entry in enumerate(entries) if entry['clean_id'] == anchor), 0)
+    elif starts_with:
+        start = bisect.bisect_left(keys, (starts_with, ''))
+
+    page = entries[start:start + limit]
+    next_cursor = encode_cursor(page[-1]) if page and start + limit < total else None
+    return {
+        'items': [dict(entry) for entry in page],
+        'next_cursor': next_cursor,
+        'total': total,
+    }
+
+# Digest of the templates and scripts the library pages are built from, so a new release changes the ETags
+def _asset_digest():
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for folder in ('templates', os.path.join('static', 'js')):
+        for name in sorted(os.listdir(os.path.join(root, folder))):
+            with open(os.path.join(root, folder, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+ASSET_DIGEST = _asset_digest()
+
+# Rendered library pages by ETag and content encoding, so unchanged pages are neither re-rendered
+# nor re-compressed (PAGE_CACHE_SIZE pages)
+PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', '32'))
+_page_cache = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+# Function to pick the best content encoding the browser accepts (None for uncompressed)
+def negotiate_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+# Function to compress a response body
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+def cached_page(key, build):
+    with _page_cache_lock:
+        body = _page_cache.get(key)
+        if body is not None:
+            _page_cache.move_to_end(key)
+            return body
+    body = build()
+    with _page_cache_lock:
+        _page_cache[key] = body
+        while len(_page_cache) > PAGE_CACHE_SIZE * 2:  # Uncompressed and one encoding per page
+            _page_cache.popitem(last=False)
+    return body
+
+# Function to serve a library page with an ETag, 304s and cached, compressed renderings
+def render_library_page(section, render):
+    snapshot = library_scanner.get_snapshot()
+    # The page depends only on the section's content, the query string and the templates
+    etag = hashlib.sha1(f"{ASSET_DIGEST}\0{snapshot.fingerprints.get(section, '')}\0"
+                        f"{request.query_string.decode('latin-1')}".encode('utf-8')).hexdigest()[:24]
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        encoding = negotiate_encoding()
+        html = cached_page((etag, None), lambda: render(snapshot.get(section)).encode('utf-8'))
+        if encoding:
+            response = Response(cached_page((etag, encoding), lambda: compress_body(html, encoding)),
+                                mimetype='text/html')
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = Response(html, mimetype='text/html')
+
+    # Weak, because the same ETag covers every content encoding of the page
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True  # Always revalidate; unchanged pages cost a 304
+    return response
+
 # Route for the main index page showing movie posters
 @app.route('/')
 def index():
-    movies, total_movies = get_poster_thumbnails(movie_folders)
-    
-    # Render the index page with movie thumbnails and total count
-    return render_template('index.html', movies=movies, total_movies=total_movies)
+    def render(movies):
+        # Only the first page is rendered; the rest is lazy-loaded from /api/movies while scrolling
+        page = paginate_media(movies, request.args)
+
+        # Render the index page with movie thumbnails and total count
+        return render_template('index.html', movies=page['items'], total_movies=len(movies),
+                               next_cursor=page['next_cursor'])
+
+    # Read the latest published catalog snapshot; no filesystem access on the request path
+    return render_library_page('movies', render)
 
 # Route for TV shows page
 @app.route('/tv')
 def tv_shows():
-    tv_shows, total_tv_shows = get_poster_thumbnails(tv_folders)
+    def render(tv_shows):
+        # Only the first page is rendered; the rest is lazy-loaded from /api/tv while scrolling
+        page = paginate_media(tv_shows, request.args)
 
-    # Log TV shows data for debugging
-    app.logger.info(f"Fetched TV shows: {tv_shows}")
+        return render_template('tv.html', tv_shows=page['items'], total_tv_shows=len(tv_shows),
+                               next_cursor=page['next_cursor'])
 
-    return render_template('tv.html', tv_shows=tv_shows, total_tv_shows=total_tv_shows)
+    return render_library_page('tv', render)
+
+# JSON API for the movie grid with cursor pagination and filtering
+@app.route('/api/movies')
+def api_movies():
+    return jsonify(paginate_media(library_scanner.get_snapshot().get('movies'), request.args))
+
+# JSON API for the TV grid with cursor pagination and filtering
+@app.route('/api/tv')
+def api_tv():
+    return jsonify(paginate_media(library_scanner.get_snapshot().get('tv'), request.args))
 
 # Route to trigger a manual refresh of media directories
 @app.route('/refresh')
 def refresh():
-    get_poster_thumbnails()  # Re-scan the directories
+    # Ask the background scanner (in whichever worker leads) for a full reconcile and return right away;
+    # re-probing every directory over SMB can take longer than a request is allowed to run
+    library_scanner.request_scan(force=True)
     return redirect(url_for('index'))
 
+# Route exposing the background scanner configuration and last scan timings
+@app.route('/scanner/status')
+def scanner_status():
+    return jsonify(library_scanner.status())
+
+# Liveness probe: answers as long as the process can serve requests, without touching the NAS or
+# the database, so a slow mount never gets a healthy container restarted
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok', 'pid': os.getpid(), 'uptime': round(time.time() - STARTED_AT, 1)})
+
+# Readiness probe: 503 until a catalog (persisted or scanned) can be served; mounts that are
+# down only mark the app degraded, since pages keep working from the index and thumbnail cache
+@app.route('/readyz')
+def readyz():
+    unavailable = [mount for mount, breaker in nas.status()['mounts'].items() if breaker['state'] != 'closed']
+    ready = library_scanner.ready
+    status = 'starting' if not ready else 'degraded' if unavailable else 'ready'
+    body = {
+        'status': status,
+        'catalog_loaded': ready,
+        'mounts_checked': _mounts_checked.is_set(),
+        'unavailable_mounts': unavailable,
+        'last_scan_error': library_scanner.last_error,
+        'uptime': round(time.time() - STARTED_AT, 1),
+    }
+    return jsonify(body), 200 if ready else 503
+
+# Route reporting NAS mount health (circuit breaker state per base folder)
+@app.route('/nas/status')
+def nas_status():
+    return jsonify(nas.status())
+
+# Route reporting queued, sent and dropped Slack notifications
+@app.route('/slack/status')
+def slack_status():
+    return jsonify(slack_notifier.stats() if slack_notifier is not None else {'enabled': False})
+
+# Route exposing TMDb response cache hit/miss counters
+@app.route('/tmdb/cache/status')
+def tmdb_cache_status():
+    return jsonify(tmdb_cache.stats())
+
+# Route reporting local thumbnail cache statistics
+@app.route('/thumbnails/cache/status')
+def thumbnail_cache_status():
+    return jsonify(thumb_cache.stats() if thumb_cache is not None else {'backend': 'off'})
+
 # Route for searching movies using TMDb API
 @app.route('/search_movie', methods=['GET'])
 def search_movie():
@@ -179,8 +628,7 @@ def search_movie():
     query = request.args.get('query', '')
 
     # Search movies on TMDb using the API
-    response = requests.get(f"{BASE_URL}/search/movie", params={"api_key": TMDB_API_KEY, "query": query})
-    results = response.json().get('results', [])
+    results = tmdb_api.get("/search/movie", query=query).get('results', [])
 
     # Generate clean IDs for each movie result
     for result in results:
@@ -198,14 +646,7 @@ def search_tv():
     app.logger.info(f"Search TV query received: {query}")
 
     # Send search request to TMDb API for TV shows, with filters for English-language results
-    response = requests.get(f"{BASE_URL}/search/tv", params={
-        "api_key": TMDB_API_KEY, 
-        "query": query, 
-        "include_adult": False, 
-        "language": "en-US", 
-        "page": 1
-    })
-    results = response.json().get('results', [])
+    results = tmdb_api.get("/search/tv", query=query, include_adult=False, language="en-US", page=1).get('results', [])
 
     # Log the number of results returned by the API
     app.logger.info(f"TMDb API returned {len(results)} results for query: {query}")
@@ -218,125 +659,389 @@ def search_tv():
     # Render search results template with TV show results
     return render_template('search_results.html', query=query, results=results, content_type="tv")
 
+# Function to rank TMDb posters: English only, sorted by resolution (highest first)
+def rank_posters(posters):
+    # Filter posters to include only English language posters
+    posters = [poster for poster in posters if poster['iso_639_1'] == 'en']
+
+    # Sort posters by resolution in descending order (area of the poster)
+    return sorted(posters, key=lambda p: p['width'] * p['height'], reverse=True)
+
+# Function to build the template data for TMDb posters (small preview for display, original for saving)
+def format_posters(posters):
+    return [{
+        'url': f"{POSTER_BASE_URL}{poster['file_path']}",
+        'preview_url': f"/preview{poster['file_path']}" if POSTER_PREVIEW_PROXY else f"{POSTER_PREVIEW_BASE_URL}{poster['file_path']}",
+        'size': f"{poster['width']}x{poster['height']}",
+        'language': poster['iso_639_1']
+    } for poster in posters]
+
+# TMDb image file names, e.g. "kqjL17yufvn9OVLyXYpvtyrFfak.jpg"
+TMDB_IMAGE_RE = re.compile(r'^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$')
+
+# Route for serving poster previews through the local cache
+@app.route('/preview/<file_name>')
+def serve_preview(file_name):
+    # Only proxy TMDb image names, never arbitrary URLs
+    if not POSTER_PREVIEW_PROXY or not TMDB_IMAGE_RE.match(file_name):
+        return "File not found", 404
+
+    data = preview_cache.get(file_name, POSTER_PREVIEW_SIZE) if preview_cache is not None else None
+    if data is None:
+        import requests  # Loaded by the TMDb client on first use
+
+        try:
+            response = tmdb_api.download(f"{POSTER_PREVIEW_BASE_URL}/{file_name}")
+        except requests.RequestException as e:
+            app.logger.error(f"Failed to fetch preview {file_name}: {e}")
+            return "Preview unavailable", 502
+        if response.status_code != 200:
+            return "Preview unavailable", 404 if response.status_code == 404 else 502
+        data = response.content
+        if preview_cache is not None:
+            preview_cache.put(file_name, POSTER_PREVIEW_SIZE, data)
+
+    response = Response(data, mimetype=mimetypes.guess_type(file_name)[0] or 'image/jpeg')
+    # TMDb never changes the image behind a file name
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000  # 1 year in seconds
+    response.cache_control.immutable = True
+    return response
+
+# Function to read the year out of a TMDb date ("2021-09-15"), used to tell same-named folders apart
+def release_year(date):
+    try:
+        return int(date[:4]) if date else None
+    except ValueError:
+        return None
+
 # Route for selecting a movie and displaying available posters
 @app.route('/select_movie/<int:movie_id>', methods=['GET'])
 def select_movie(movie_id):
-    # Fetch detailed information about the selected movie from TMDb API
-    movie_details = requests.get(f"{BASE_URL}/movie/{movie_id}", params={"api_key": TMDB_API_KEY}).json()
+    # Fetch movie details and available posters from TMDb concurrently
+    movie_details, movie_images = tmdb_api.get_many([(f"/movie/{movie_id}", {}), (f"/movie/{movie_id}/images", {})])
 
     # Extract movie title and generate a clean ID for URL/anchor purposes
     movie_title = movie_details.get('title', '')
     clean_id = generate_clean_id(movie_title)
 
-    # Request available posters for the selected movie from TMDb API
-    posters = requests.get(f"{BASE_URL}/movie/{movie_id}/images", params={"api_key": TMDB_API_KEY}).json().get('posters', [])
-
-    # Filter posters to include only English language posters
-    posters = [poster for poster in posters if poster['iso_639_1'] == 'en']
-
-    # Function to calculate poster resolution for sorting
-    def poster_resolution(poster):
-        return poster['width'] * poster['height']  # Calculate area of the poster
+    # Available posters for the selected movie
+    posters = movie_images.get('posters', [])
 
-    # Sort posters by resolution in descending order (highest resolution first)
-    posters_sorted = sorted(posters, key=poster_resolution, reverse=True)
+    # English posters only, highest resolution first
+    posters_sorted = rank_posters(posters)
 
-    # Format poster details for display, including full URL, dimensions, and language
-    formatted_posters = [{
-        'url': f"{POSTER_BASE_URL}{poster['file_path']}",
-        'size': f"{poster['width']}x{poster['height']}",
-        'language': poster['iso_639_1']
-    } for poster in posters_sorted]
+    # Format poster details for display: preview URL, full URL to download, dimensions, and language
+    formatted_posters = format_posters(posters_sorted)
 
     # Render poster selection template with sorted posters and movie details
-    return render_template('poster_selection.html', media_title=movie_title, content_type='movie', posters=formatted_posters)
+    return render_template('poster_selection.html', media_title=movie_title, content_type='movie', posters=formatted_posters,
+                           media_year=release_year(movie_details.get('release_date')))
 
 # Route for selecting a TV show and displaying available posters
 @app.route('/select_tv/<int:tv_id>', methods=['GET'])
 def select_tv(tv_id):
-    # Fetch detailed information about the selected TV show from TMDb API
-    tv_details = requests.get(f"{BASE_URL}/tv/{tv_id}", params={"api_key": TMDB_API_KEY}).json()
+    # Fetch TV show details and available posters from TMDb concurrently
+    tv_details, tv_images = tmdb_api.get_many([(f"/tv/{tv_id}", {}), (f"/tv/{tv_id}/images", {})])
 
     # Extract TV show title and generate a clean ID for URL/anchor purposes
     tv_title = tv_details.get('name', '')
     clean_id = generate_clean_id(tv_title)
 
-    # Request available posters for the selected TV show from TMDb API
-    posters = requests.get(f"{BASE_URL}/tv/{tv_id}/images", params={"api_key": TMDB_API_KEY}).json().get('posters', [])
+    # Available posters for the selected TV show
+    posters = tv_images.get('posters', [])
 
-    # Filter posters to include only English language posters
-    posters = [poster for poster in posters if poster['iso_639_1'] == 'en']
+    # English posters only, highest resolution first
+    posters_sorted = rank_posters(posters)
 
-    # Sort posters by resolution in descending order (highest resolution first)
-    posters_sorted = sorted(posters, key=lambda p: p['width'] * p['height'], reverse=True)
-
-    # Format poster details for display, including full URL, dimensions, and language
-    formatted_posters = [{
-        'url': f"{POSTER_BASE_URL}{poster['file_path']}",
-        'size': f"{poster['width']}x{poster['height']}",
-        'language': poster['iso_639_1']
-    } for poster in posters_sorted]
+    # Format poster details for display: preview URL, full URL to download, dimensions, and language
+    formatted_posters = format_posters(posters_sorted)
 
     # Render poster selection template with sorted posters, TV show details, and content type
-    return render_template('poster_selection.html', posters=formatted_posters, media_title=tv_title, clean_id=clean_id, content_type="tv")
+    return render_template('poster_selection.html', posters=formatted_posters, media_title=tv_title, clean_id=clean_id, content_type="tv",
+                           media_year=release_year(tv_details.get('first_air_date')),
+                           seasons_url=url_for('select_tv_seasons', tv_id=tv_id))
+
+# Number of season previews offered per season, and seasons downloaded at once by a bulk apply
+SEASON_POSTER_CHOICES = int(os.getenv('SEASON_POSTER_CHOICES', '6'))
+SEASON_WORKERS = int(os.getenv('SEASON_WORKERS', '4'))
+
+# Function to rank season posters: like rank_posters, but falling back to language-neutral artwork
+def rank_season_posters(posters):
+    ranked = rank_posters(posters)
+    if not ranked:
+        ranked = sorted((poster for poster in posters if poster['iso_639_1'] is None),
+                        key=lambda p: p['width'] * p['height'], reverse=True)
+    return ranked
+
+# Route for choosing season posters for a TV show (GET) and applying them all at once (POST)
+@app.route('/select_tv/<int:tv_id>/seasons', methods=['GET', 'POST'])
+def select_tv_seasons(tv_id):
+    tv_details = tmdb_api.get(f"/tv/{tv_id}")
+    tv_title = tv_details.get('name', '')
+    season_numbers = sorted(season['season_number'] for season in tv_details.get('seasons', []))
+
+    # The show's folder and the season artwork already in it
+    match = get_directory_matcher('tv').match(tv_title, year=release_year(tv_details.get('first_air_date')), threshold=0.8)
+    entry = get_media_entry(match.name) if match is not None else None
+    existing = set(entry['season_posters']) if entry is not None else set()
+
+    if request.method == 'POST':
+        if match is None:
+            app.logger.error(f"No TV folder found for '{tv_title}'")
+            return "Directory not found", 404
+
+        # One chosen poster URL per season (season_<n> fields); optionally skip seasons that have artwork
+        missing_only = request.form.get('missing_only', 'false').lower() in ('true', 'on')
+        choices = {}
+        for season in season_numbers:
+            poster_url = request.form.get(f"season_{season}")
+            if poster_url and poster_url.startswith(POSTER_BASE_URL) and not (missing_only and season in existing):
+                choices[season] = poster_url
+        if not choices:
+            return "Bad Request: No season posters selected", 400
+
+        job = job_queue.submit(f"{match.path}#seasons", f"Season posters for '{tv_title}'", save_season_posters_job,
+                               choices, tv_title, match.path)
+        return job_response(job, tv_title, 'tv')
+
+    # Fetch every season's artwork concurrently instead of one round trip per season
+    season_images = tmdb_api.get_many([(f"/tv/{tv_id}/season/{season}/images", {}) for season in season_numbers])
+    seasons = []
+    for season, images in zip(season_numbers, season_images):
+        posters = rank_season_posters(images.get('posters', []))[:SEASON_POSTER_CHOICES]
+        seasons.append({
+            'number': season,
+            'name': 'Specials' if season == 0 else f"Season {season}",
+            'file_name': season_poster_name(season),
+            'has_poster': season in existing,
+            'posters': format_posters(posters),
+        })
+
+    return render_template('season_selection.html', media_title=tv_title, tv_id=tv_id, seasons=seasons,
+                           folder=match.name if match is not None else None)
+
+# Size of the chunks streamed from the image CDN to disk
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 # Function to handle poster download and thumbnail creation
-def save_poster_and_thumbnail(poster_url, movie_title, save_dir):
+def save_poster_and_thumbnail(poster_url, movie_title, save_dir, publish=True):
     # Define full paths for the poster and thumbnail
     full_poster_path = os.path.join(save_dir, 'poster.jpg')
-    thumb_poster_path = os.path.join(save_dir, 'poster-thumb.jpg')
+
+    # Temporary files live in the target directory so the final rename is atomic
+    temp_paths = []
 
     try:
-        # Remove any existing poster files in the directory
-        for ext in ['jpg', 'jpeg', 'png']:
-            existing_poster = os.path.join(save_dir, f'poster.{ext}')
-            existing_thumb = os.path.join(save_dir, f'poster-thumb.{ext}')
-            if os.path.exists(existing_poster):
-                os.remove(existing_poster)
-            if os.path.exists(existing_thumb):
-                os.remove(existing_thumb)
-
-        # Download the full-resolution poster from the URL
-        response = requests.get(poster_url)
-        if response.status_code == 200:
-            # Save the downloaded poster image
-            with open(full_poster_path, 'wb') as file:
-                file.write(response.content)
-
-            # Create a thumbnail using Pillow image processing library
-            with Image.open(full_poster_path) as img:
-                # Calculate aspect ratio to maintain consistent thumbnail dimensions
-                aspect_ratio = img.width / img.height
-                target_ratio = 300 / 450  # Desired thumbnail ratio
-
-                # Crop the image to match the target aspect ratio
-                if aspect_ratio > target_ratio:
-                    # Image is wider than desired ratio, crop the sides
-                    new_width = int(img.height * target_ratio)
-                    left = (img.width - new_width) // 2
-                    img = img.crop((left, 0, left + new_width, img.height))
-                else:
-                    # Image is taller than desired ratio, crop the top and bottom
-                    new_height = int(img.width / target_ratio)
-                    top = (img.height - new_height) // 2
-                    img = img.crop((0, top, img.width, top + new_height))
-
-                # Resize the image to 300x450 pixels with high-quality Lanczos resampling
-                img = img.resize((300, 450), Image.LANCZOS)
-
-                # Save the thumbnail image with high JPEG quality
-                img.save(thumb_poster_path, "JPEG", quality=90)
-
-            print(f"Poster and thumbnail saved successfully for '{movie_title}'")
-            return full_poster_path  # Return the local path where the poster was saved
-        else:
+        started = time.perf_counter()
+
+        # Stream the full-resolution poster from the URL
+        response = tmdb_api.download(poster_url, stream=True)
+        if response.status_code != 200:
             print(f"Failed to download poster for '{movie_title}'. Status code: {response.status_code}")
+            response.close()
             return None
 
+        # Write chunks to a temp file while keeping the bytes for the thumbnail,
+        # so the poster is never read back from the share (the bytearray is decoded in place, never copied)
+        image_bytes = bytearray()
+        fd, temp_poster_path = tempfile.mkstemp(prefix='.poster-', suffix='.tmp', dir=save_dir)
+        temp_paths.append(temp_poster_path)
+        with response, os.fdopen(fd, 'wb') as file:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+                image_bytes.extend(chunk)
+        download_time = time.perf_counter() - started
+        metrics.DOWNLOAD_SECONDS.observe(download_time)
+        metrics.DOWNLOAD_BYTES.inc(len(image_bytes))
+
+        # Create every thumbnail size/format from memory into temp files
+        with metrics.THUMBNAIL_SECONDS.time():
+            thumbnails = write_thumbnails(image_bytes, save_dir)
+        temp_paths.extend(temp_path for temp_path, _ in thumbnails)
+
+        # Swap the files into place; until now the old poster stays untouched
+        os.replace(temp_poster_path, full_poster_path)
+        for temp_path, final_path in thumbnails:
+            os.replace(temp_path, final_path)
+        temp_paths.clear()
+        remove_stale_variants(save_dir, keep=[final_path for _, final_path in thumbnails])
+
+        # Remove posters in other formats that would otherwise shadow or duplicate the new one
+        for ext in ['jpeg', 'png']:
+            for name in (f'poster.{ext}', f'poster-thumb.{ext}'):
+                stale_path = os.path.join(save_dir, name)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
     except Exception as e:
         print(f"Error saving poster and generating thumbnail for '{movie_title}': {e}")
         return None
 
+    finally:
+        # A failed download leaves the existing poster in place; just drop the temp files
+        for temp_path in temp_paths:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # Re-probe this directory and publish it so the next page load shows the new poster
+    # (bulk runs publish once at the end instead). The poster is already in place,
+    # so a failure here is logged rather than failing the save
+    try:
+        library_index.refresh(save_dir)
+        if publish:
+            library_scanner.republish()
+    except Exception as e:
+        app.logger.exception(f"Poster saved for '{movie_title}', but updating the library index failed: {e}")
+
+    print(f"Poster and thumbnail saved successfully for '{movie_title}' "
+          f"({len(image_bytes) // 1024} KB downloaded in {download_time:.2f}s, "
+          f"{time.perf_counter() - started:.2f}s total)")
+    return full_poster_path  # Return the local path where the poster was saved
+
+# Background job: download the poster, build the thumbnail, then notify Slack
+def save_poster_job(poster_url, media_title, save_dir):
+    local_poster_path = save_poster_and_thumbnail(poster_url, media_title, save_dir)
+    if not local_poster_path:
+        raise RuntimeError(f"Failed to save poster for '{media_title}'")
+
+    app.logger.info(f"Poster successfully saved to {local_poster_path}")
+    message = f"Poster for '{media_title}' has been downloaded!"
+    send_slack_notification(message, local_poster_path, poster_url)
+    return local_poster_path
+
+# Function to download an image from the TMDb CDN into memory
+def download_image(url):
+    started = time.perf_counter()
+    response = tmdb_api.download(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"Download of {url} failed with status code {response.status_code}")
+    metrics.DOWNLOAD_SECONDS.observe(time.perf_counter() - started)
+    metrics.DOWNLOAD_BYTES.inc(len(response.content))
+    return response.content
+
+# Background job: download every chosen season poster concurrently, write thumbnails, then notify Slack once
+def save_season_posters_job(choices, media_title, save_dir):
+    started = time.perf_counter()
+    saved, failed = save_season_posters(download_image, choices, save_dir, workers=SEASON_WORKERS)
+    for season, error in failed.items():
+        app.logger.error(f"Season {season} poster for '{media_title}' failed: {error}")
+    if not saved:
+        raise RuntimeError(f"Failed to save season posters for '{media_title}'")
+
+    # One index refresh and one publish for the whole show. The season posters are already in place,
+    # so a failure here is logged rather than failing the job
+    try:
+        library_index.refresh(save_dir)
+        library_scanner.republish()
+    except Exception as e:
+        app.logger.exception(f"Season posters saved for '{media_title}', but updating the library index failed: {e}")
+    print(f"Saved {len(saved)} season poster(s) for '{media_title}' in {time.perf_counter() - started:.2f}s")
+
+    message = f"Season posters for '{media_title}' have been downloaded! ({len(saved)} of {len(choices)} seasons)"
+    send_slack_notification(message, save_dir, choices[min(saved)])
+    return {'saved': saved, 'failed': failed}
+
+# Function to queue a poster save and answer the request immediately
+def queue_poster_save(poster_url, media_title, save_dir, media_type):
+    # Jobs are deduplicated per directory and poster, so double-clicks don't download twice;
+    # picking a different poster while one is still downloading for the folder is refused
+    try:
+        job = job_queue.submit_exclusive(f"{save_dir}#poster", poster_url, f"Poster for '{media_title}'",
+                                         save_poster_job, poster_url, media_title, save_dir)
+    except JobConflict as e:
+        app.logger.warning(f"Not queuing {poster_url} for {save_dir}: {e}")
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': str(e), 'job': e.job.to_dict()}), 409
+        return f"{e}. Wait for it to finish, then choose the poster again.", 409
+    return job_response(job, media_title, media_type)
+
+# Function to answer a request that queued a job
+def job_response(job, media_title, media_type):
+    # API clients get the job to poll; browsers go back to the grid, which polls the job itself
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202
+
+    redirect_url = url_for('tv_shows' if media_type == 'tv' else 'index', job=job.id)
+    anchor = generate_clean_id(media_title)
+    app.logger.info(f"Queued job {job.id}, redirect URL: {redirect_url}#{anchor}")
+    return redirect(f"{redirect_url}#{anchor}")
+
+# Route reporting the status of a background job
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+# Route listing recent background jobs
+@app.route('/jobs')
+def list_jobs():
+    return jsonify(job_queue.list())
+
+# Bulk "fill missing posters" runner; BATCH_WORKERS titles are processed at once
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+missing_poster_filler = MissingPosterFiller(
+    tmdb_api,
+    rank_posters=rank_posters,
+    save_poster=lambda poster_url, title, save_dir: save_poster_and_thumbnail(poster_url, title, save_dir, publish=False),
+    poster_base_url=POSTER_BASE_URL,
+    normalize_title=normalize_title,
+    state_dir=DATA_DIR,
+    workers=BATCH_WORKERS,
+    logger=app.logger,
+)
+
+# Function to list (folder name, save directory) for every title without a poster
+def missing_poster_entries(media_type):
+    section = 'tv' if media_type == 'tv' else 'movies'
+    return [(entry['title'], os.path.join(entry['base_folder'], entry['title']))
+            for entry in library_scanner.get_snapshot().get(section) if not entry['poster']]
+
+# Function to fill posters for every title that doesn't have one (CLI: python batch.py)
+def fill_missing_posters(media_type, dry_run=False, restart=False):
+    try:
+        return missing_poster_filler.run(missing_poster_entries(media_type), media_type, dry_run=dry_run, restart=restart)
+    finally:
+        # Saves only refresh their own directory in the index; publish the catalog once for the whole run
+        if not dry_run:
+            library_scanner.republish()
+
+# Admin route for bulk poster filling: POST starts a run as a background job, GET reports progress
+@app.route('/admin/fill_missing', methods=['GET', 'POST'])
+def admin_fill_missing():
+    media_type = request.values.get('media_type', 'movie')
+    if media_type not in ('movie', 'tv'):
+        return jsonify({'error': 'media_type must be movie or tv'}), 400
+
+    if request.method == 'GET':
+        return jsonify(missing_poster_filler.progress(media_type))
+
+    dry_run = request.values.get('dry_run', 'false').lower() == 'true'
+    restart = request.values.get('restart', 'false').lower() == 'true'
+    job = job_queue.submit(f"fill-missing-{media_type}", f"Fill missing {media_type} posters",
+                           fill_missing_posters, media_type, dry_run=dry_run, restart=restart)
+    return jsonify(job.to_dict()), 202
+
+# Directory matchers per section, rebuilt whenever the scanner publishes a new snapshot
+_directory_matchers = {}
+_directory_matchers_lock = threading.Lock()
+
+# Function to get the directory matching index for movies or TV shows
+def get_directory_matcher(media_type):
+    section = 'tv' if media_type == 'tv' else 'movies'
+    snapshot = library_scanner.get_snapshot()
+    with _directory_matchers_lock:
+        version, matcher = _directory_matchers.get(section, (None, None))
+        if version != snapshot.version:
+            matcher = DirectoryMatcher([(entry['title'], os.path.join(entry['base_folder'], entry['title']))
+                                        for entry in snapshot.get(section)])
+            _directory_matchers[section] = (snapshot.version, matcher)
+        return matcher
+
 # Route for handling poster selection and downloading
 @app.route('/select_poster', methods=['POST'])
 def select_poster():
@@ -353,67 +1058,22 @@ def select_poster():
         poster_url = request.form['poster_path']
         media_title = request.form['media_title']
         media_type = request.form['media_type']  # Should be either 'movie' or 'tv'
+        media_year = release_year(request.form.get('media_year'))  # Tells apart folders sharing a title
 
         # Log detailed information about the poster selection
         app.logger.info(f"Poster Path: {poster_url}, Media Title: {media_title}, Media Type: {media_type}")
 
-        # Select base folders based on media type (movies or TV shows)
-        base_folders = movie_folders if media_type == 'movie' else tv_folders
-
-        # Initialize variables for directory matching
-        save_dir = None
-        possible_dirs = []
-        best_similarity = 0
-        best_match_dir = None
-
-        # Normalize media title for comparison
-        normalized_media_title = normalize_title(media_title)
-
-        # Search for an exact or closest matching directory
-        for base_folder in base_folders:
-            directories = safe_listdir(base_folder)
-            possible_dirs.extend(directories)
-
-            for directory in directories:
-                normalized_dir_name = normalize_title(directory)
-                # Calculate string similarity between media title and directory name
-                similarity = SequenceMatcher(None, normalized_media_title, normalized_dir_name).ratio()
-
-                # Update best match if current similarity is higher
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match_dir = os.path.join(base_folder, directory)
-
-                # If exact match found, set save directory
-                if directory == media_title:
-                    save_dir = os.path.join(base_folder, directory)
-                    break
-
-            if save_dir:
-                break
-
-        # If an exact match is found, proceed with downloading
-        if save_dir:
-            local_poster_path = save_poster_and_thumbnail(poster_url, media_title, save_dir)
-            if local_poster_path:
-                # Send Slack notification about successful poster download
-                message = f"Poster for '{media_title}' has been downloaded!"
-                send_slack_notification(message, local_poster_path, poster_url)
-            return redirect(url_for('tv_shows' if media_type == 'tv' else 'index') + f"#{generate_clean_id(media_title)}")
-
-        # If no exact match, use best similarity match above a threshold
-        similarity_threshold = 0.8
-        if best_similarity >= similarity_threshold:
-            save_dir = best_match_dir
-            local_poster_path = save_poster_and_thumbnail(poster_url, media_title, save_dir)
-            if local_poster_path:
-                # Send Slack notification about successful poster download
-                message = f"Poster for '{media_title}' has been downloaded!"
-                send_slack_notification(message, local_poster_path, poster_url)
-            return redirect(url_for('tv_shows' if media_type == 'tv' else 'index') + f"#{generate_clean_id(media_title)}")
+        # Look the title up in the prebuilt directory index (exact, normalized, then fuzzy)
+        matcher = get_directory_matcher(media_type)
+        match = matcher.match(media_title, year=media_year, threshold=0.8)
+
+        # If a matching directory is found, queue the download and return right away
+        if match is not None:
+            app.logger.info(f"Matched '{media_title}' to '{match.name}' ({match.method}, score {match.score:.2f})")
+            return queue_poster_save(poster_url, media_title, match.path, media_type)
 
         # If no suitable directory found, present user with directory selection options
-        similar_dirs = get_close_matches(media_title, possible_dirs, n=5, cutoff=0.5)
+        similar_dirs = matcher.suggestions(media_title, n=5, cutoff=0.5)
         return render_template('select_directory.html', similar_dirs=similar_dirs, media_title=media_title, poster_path=poster_url, media_type=media_type)
 
     except FileNotFoundError as fnf_error:
@@ -425,36 +1085,136 @@ def select_poster():
         app.logger.exception("Unexpected error in select_poster route: %s", e)
         return "Internal Server Error", 500
 
+# Media entries by folder name, rebuilt whenever the scanner publishes a new snapshot
+_media_entries = (None, {})
+_media_entries_lock = threading.Lock()
+
+# Function to look up a catalog entry by its folder name (movies take precedence over TV)
+def get_media_entry(media_dir):
+    global _media_entries
+    snapshot = library_scanner.get_snapshot()
+    with _media_entries_lock:
+        version, entries = _media_entries
+        if version != snapshot.version:
+            entries = {}
+            for section in ('movies', 'tv'):
+                for entry in snapshot.get(section):
+                    entries.setdefault(entry['title'], entry)
+            _media_entries = (snapshot.version, entries)
+    return entries.get(media_dir)
+
+# Function to choose the thumbnail variant that best fits the browser (Accept) and width hint (?w=)
+def negotiate_thumbnail(filename):
+    media_dir, _, name = filename.rpartition('/')
+    if not name.startswith('poster-thumb') or parse_variant(name) is None:
+        return filename, False
+    entry = get_media_entry(media_dir)
+    if entry is None or not entry['thumb_variants']:
+        return filename, False
+
+    variants = {parse_variant(variant): variant for variant in entry['thumb_variants']}
+    widths = sorted({width for width, _ in variants})
+    try:
+        wanted = int(request.args.get('w', parse_variant(name)[0]))
+    except ValueError:
+        wanted = DEFAULT_WIDTH
+    width = next((w for w in widths if w >= wanted), widths[-1])
+
+    # Most compact format the browser accepts, JPEG as the fallback
+    formats = [fmt for fmt in ('avif', 'webp') if MIME_TYPES[fmt] in request.accept_mimetypes.values()] + ['jpg']
+    for fmt in formats:
+        variant = variants.get((width, fmt))
+        if variant is not None:
+            return f"{media_dir}/{variant}", True
+    return filename, True
+
+# Function to find a poster file by probing each base folder (for folders not in the catalog yet)
+def find_in_base_folders(filename):
+    for base_folder in movie_folders + tv_folders:
+        full_path = os.path.join(base_folder, filename)
+        # Skip Synology NAS special directories
+        if '@eaDir' in full_path:
+            continue
+        if nas.exists(full_path):
+            return full_path
+    return None
+
 # Route for serving posters from the file system
 @app.route('/poster/<path:filename>')
 def serve_poster(filename):
-    # Combine movie and TV folders to search both sets of paths
-    base_folders = movie_folders + tv_folders
+    # Thumbnails may be swapped for a smaller or better-compressed variant
+    filename, negotiated = negotiate_thumbnail(filename)
 
     # Check if a "refresh" flag is present in the URL query parameters
     refresh = request.args.get('refresh', 'false')
-    for base_folder in base_folders:
-        full_path = os.path.join(base_folder, filename)
-        # Skip Synology NAS special directories
-        if '@eaDir' in full_path:
-            continue
-        if os.path.exists(full_path):
-            # Serve the file from the appropriate directory using safe_send_file
-            # to handle BlockingIOError on SMB mounts
-            response = safe_send_file(full_path)
-            if refresh == 'true':
-                # If refresh is requested, set no-cache headers
-                response.cache_control.no_cache = True
-                response.cache_control.must_revalidate = True
-                response.cache_control.max_age = 0
-            else:
-                # Set long-term caching for efficiency
-                response.cache_control.max_age = 31536000  # 1 year in seconds
-            return response
 
-    # Log an error if the file is not found
-    app.logger.error(f"File not found for {filename} in any base folder.")
-    return "File not found", 404
+    # Resolve the base folder from the catalog rather than probing every share
+    media_dir, _, name = filename.rpartition('/')
+    entry = get_media_entry(media_dir) if '@eaDir' not in filename else None
+    if entry is not None:
+        full_path = os.path.join(entry['base_folder'], filename)
+        version = entry['version']
+    else:
+        full_path = find_in_base_folders(filename)
+        version = None
+    if full_path is None:
+        # Log an error if the file is not found
+        app.logger.error(f"File not found for {filename} in any base folder.")
+        return "File not found", 404
+
+    etag = cache_key(full_path, version)[:20] if version is not None else None
+    if etag and refresh != 'true' and etag in request.if_none_match:
+        # The browser already has this version; answer without touching the NAS
+        response = Response(status=304)
+    else:
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        try:
+            if not name.startswith('poster-thumb'):
+                # Full-size posters can be several MB: open them on an I/O thread and stream them,
+                # so SMB_TIMEOUT only covers opening the file, not transferring it
+                file = nas.open(full_path)
+                response = Response(wrap_file(request.environ, file), mimetype=mimetype, direct_passthrough=True)
+                response.content_length = os.fstat(file.fileno()).st_size
+            elif thumb_cache is not None and version is not None:
+                # Thumbnails come from the local cache, read from the NAS only on a miss
+                data = thumb_cache.get(full_path, version)
+                metrics.THUMB_CACHE_RESULTS.inc(result='miss' if data is None else 'hit')
+                if data is None:
+                    data = nas.read(full_path)
+                    thumb_cache.put(full_path, version, data)
+                response = Response(data, mimetype=mimetype)
+            else:
+                # Read through the NAS I/O threads, which retry BlockingIOError on SMB mounts
+                response = Response(nas.read(full_path), mimetype=mimetype)
+        except FileNotFoundError:
+            app.logger.error(f"File not found for {filename} in {os.path.dirname(full_path)}.")
+            return "File not found", 404
+        except MountUnavailable as e:
+            # Fail fast so the page keeps loading; the browser can retry once the mount recovers
+            app.logger.warning(f"Not serving {filename}: {e}")
+            return "Poster temporarily unavailable", 503, {'Retry-After': str(int(nas.reset_timeout))}
+
+    if etag:
+        response.set_etag(etag)
+        response.last_modified = version / 1000
+    if refresh == 'true':
+        # If refresh is requested, set no-cache headers
+        response.cache_control.no_cache = True
+        response.cache_control.must_revalidate = True
+        response.cache_control.max_age = 0
+    elif version is not None and request.args.get('v') == str(version):
+        # Versioned URLs change whenever the poster does, so they can be cached for good
+        response.cache_control.max_age = 31536000  # 1 year in seconds
+        response.cache_control.immutable = True
+    else:
+        # Unversioned URLs are revalidated with the ETag on every use
+        response.cache_control.no_cache = True
+    if negotiated:
+        # The same URL returns different formats depending on the Accept header
+        response.vary.add('Accept')
+    if response.status_code == 200:
+        response = response.make_conditional(request)
+    return response
 
 # Route for manually confirming the directory and saving the poster
 @app.route('/confirm_directory', methods=['POST'])
@@ -479,7 +1239,12 @@ def confirm_directory():
     base_folders = movie_folders if content_type == 'movie' else tv_folders
 
     for base_folder in base_folders:
-        if selected_directory in safe_listdir(base_folder):
+        try:
+            names = nas.listdir(base_folder)
+        except MountUnavailable as e:
+            app.logger.warning(f"Skipping {base_folder}: {e}")
+            continue
+        if selected_directory in names:
             save_dir = os.path.join(base_folder, selected_directory)
             break
 
@@ -488,52 +1253,14 @@ def confirm_directory():
         app.logger.error(f"Selected directory '{selected_directory}' not found in base folders.")
         return "Directory not found", 404
 
-    # Save the poster and get the local path
-    local_poster_path = save_poster_and_thumbnail(poster_url, movie_title, save_dir)
-    if local_poster_path:
-        # Send Slack notification about successful download
-        message = f"Poster for '{movie_title}' has been downloaded!"
-        send_slack_notification(message, local_poster_path, poster_url)
-        app.logger.info(f"Poster successfully saved to {local_poster_path}")
-    else:
-        app.logger.error(f"Failed to save poster for '{movie_title}'")
-        return "Failed to save poster", 500
-
-    # Generate clean ID for navigation anchor
-    anchor = generate_clean_id(movie_title)
-    
-    # Determine redirect URL based on content type
-    redirect_url = url_for('index') if content_type == 'movie' else url_for('tv_shows')
-
-    # Log the redirect URL for verification
-    app.logger.info(f"Redirect URL: {redirect_url}#{anchor}")
-
-    return redirect(f"{redirect_url}#{anchor}")
+    # Queue the download and thumbnail generation; the browser is redirected right away
+    return queue_poster_save(poster_url, movie_title, save_dir, content_type)
 
 # Function to send Slack notifications about poster downloads
 def send_slack_notification(message, local_poster_path, poster_url):
-    # Retrieve Slack webhook URL from environment variables
-    slack_webhook_url = os.getenv('SLACK_WEBHOOK_URL')
-    if slack_webhook_url:
-        # Prepare Slack payload with message and poster details
-        payload = {
-            "text": message,
-            "attachments": [
-                {
-                    "text": f"Poster saved to: {local_poster_path}",
-                    "image_url": poster_url  # Display original TMDb poster in Slack
-                }
-            ]
-        }
-        try:
-            # Send notification to Slack
-            response = requests.post(slack_webhook_url, json=payload)
-            if response.status_code == 200:
-                print(f"Slack notification sent successfully for '{local_poster_path}'")
-            else:
-                print(f"Failed to send Slack notification. Status code: {response.status_code}")
-        except Exception as e:
-            print(f"Error sending Slack notification: {e}")
+    if slack_notifier is not None:
+        # Queued: the dispatcher batches notifications and posts them in the background
+        slack_notifier.notify(message, f"Poster saved to: {local_poster_path}", poster_url)  # Original TMDb poster
     else:
         print("Slack webhook URL not set.")
 
@@ -544,6 +1271,9 @@ def refresh_page():
 
 # Main entry point for running the Flask application
 if __name__ == '__main__':
+    # Start the background scanner before serving so the first visitor gets a warm catalog
+    library_scanner.start()
+
     # Start the app, listening on all network interfaces at port 5000
     app.run(
         host="0.0.0.0",
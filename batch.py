@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+# Per-directory outcomes of a fill run
+SAVED = 'saved'
+WOULD_SAVE = 'would_save'
+NO_MATCH = 'no_match'
+NO_POSTER = 'no_poster'
+FAILED = 'failed'
+
+# Outcomes that a resumed run doesn't retry
+FINAL_STATUSES = {SAVED, NO_MATCH, NO_POSTER}
+
+
+# Function to split a folder name like "Alien (1979)" into its title and year
+def parse_folder_name(name):
+    match = re.match(r'^(.*?)\s*\((\d{4})\)\s*$', name)
+    if match:
+        return match.group(1), int(match.group(2))
+    return name, None
+
+
+class MissingPosterFiller:
+    """
+    Bulk-assigns posters to media directories that don't have one.
+
+    Each directory is resolved to a TMDb id through search, the best English poster
+    is picked with the same ranking the selection page uses and downloaded. Work runs
+    on a bounded pool; progress of real runs is written to a JSON state file after
+    every title so an interrupted run can be resumed.
+    """
+
+    def __init__(self, tmdb, rank_posters, save_poster, poster_base_url, normalize_title, state_dir,
+                 workers=4, min_similarity=0.8, logger=None):
+        self.tmdb = tmdb
+        self.rank_posters = rank_posters
+        self.save_poster = save_poster
+        self.poster_base_url = poster_base_url
+        self.normalize_title = normalize_title
+        self.state_dir = state_dir
+        self.workers = max(1, workers)
+        self.min_similarity = min_similarity  # Below this a search result is a different title, not a match
+        self.logger = logger
+        self._lock = threading.Lock()
+
+    def state_path(self, media_type):
+        return os.path.join(self.state_dir, f"fill_missing_{media_type}.json")
+
+    def progress(self, media_type):
+        """
+        Return the saved state of the last real run for a media type (empty if none).
+        """
+        try:
+            with open(self.state_path(media_type)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, media_type, state):
+        # Write to a temp file and rename so a crash never leaves a truncated state file
+        path = self.state_path(media_type)
+        os.makedirs(self.state_dir, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, path)
+
+    def resolve(self, media_type, folder_name):
+        """
+        Find the TMDb id for a folder, preferring an exact title (and year) match, then the most
+        similar title. Returns (tmdb_id, tmdb_title), or None if no result is similar enough.
+        """
+        title, year = parse_folder_name(folder_name)
+        if media_type == 'movie':
+            params = {'query': title}
+            if year:
+                params['primary_release_year'] = year
+            results = self.tmdb.get('/search/movie', **params).get('results', [])
+            title_field, date_field = 'title', 'release_date'
+        else:
+            params = {'query': title, 'include_adult': False, 'language': 'en-US', 'page': 1}
+            if year:
+                params['first_air_date_year'] = year
+            results = self.tmdb.get('/search/tv', **params).get('results', [])
+            title_field, date_field = 'name', 'first_air_date'
+
+        if not results:
+            return None
+
+        wanted = self.normalize_title(title)
+        best = None
+        best_score = 0
+        for result in results:
+            candidate = self.normalize_title(result.get(title_field, ''))
+            same_year = not year or (result.get(date_field) or '').startswith(str(year))
+            if candidate == wanted and same_year:
+                return result['id'], result.get(title_field, '')
+            # Otherwise keep the closest title; a search miss must not pull in an unrelated poster
+            score = SequenceMatcher(None, wanted, candidate).ratio()
+            if score > best_score:
+                best, best_score = result, score
+        if best is None or best_score < self.min_similarity:
+            return None
+        return best['id'], best.get(title_field, '')
+
+    def best_poster_url(self, media_type, tmdb_id):
+        posters = self.tmdb.get(f"/{media_type}/{tmdb_id}/images").get('posters', [])
+        ranked = self.rank_posters(posters)
+        if not ranked:
+            return None
+        return f"{self.poster_base_url}{ranked[0]['file_path']}"
+
+    def _process(self, media_type, folder_name, save_dir, dry_run):
+        result = {'title': folder_name, 'save_dir': save_dir, 'tmdb_id': None, 'tmdb_title': None,
+                  'poster_url': None, 'status': None, 'error': None}
+        try:
+            match = self.resolve(media_type, folder_name)
+            if match is None:
+                result['status'] = NO_MATCH
+                return result
+            result['tmdb_id'], result['tmdb_title'] = match
+
+            result['poster_url'] = self.best_poster_url(media_type, result['tmdb_id'])
+            if result['poster_url'] is None:
+                result['status'] = NO_POSTER
+            elif dry_run:
+                result['status'] = WOULD_SAVE
+            elif self.save_poster(result['poster_url'], folder_name, save_dir):
+                result['status'] = SAVED
+            else:
+                result['status'] = FAILED
+                result['error'] = 'Download or thumbnail generation failed'
+        except Exception as e:
+            result['status'] = FAILED
+            result['error'] = str(e)
+        return result
+
+    def run(self, entries, media_type, dry_run=False, restart=False):
+        """
+        Fill posters for `entries`, a list of (folder_name, save_dir) tuples.
+        Returns a report with per-title results and counts per outcome.
+        """
+        # Real runs resume from the previous state unless asked to start over
+        state = {} if dry_run or restart else self.progress(media_type)
+        previous = state.get('results', {})
+        state = {'media_type': media_type, 'started_at': state.get('started_at', time.time()),
+                 'updated_at': time.time(), 'results': previous}
+
+        pending = [(name, save_dir) for name, save_dir in entries
+                   if previous.get(save_dir, {}).get('status') not in FINAL_STATUSES]
+        if self.logger is not None:
+            self.logger.info(f"Filling missing {media_type} posters: {len(pending)} to do, "
+                             f"{len(entries) - len(pending)} already handled{' (dry run)' if dry_run else ''}")
+
+        def work(item):
+            result = self._process(media_type, item[0], item[1], dry_run)
+            with self._lock:
+                state['results'][result['save_dir']] = result
+                state['updated_at'] = time.time()
+                if not dry_run:
+                    self._write_state(media_type, state)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fill') as pool:
+            results = list(pool.map(work, pending))
+
+        counts = {}
+        for result in state['results'].values():
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        return {
+            'media_type': media_type,
+            'dry_run': dry_run,
+            'total': len(entries),
+            'processed': len(results),
+            'counts': counts,
+            'results': sorted(state['results'].values(), key=lambda r: r['title'].lower()),
+        }
+
+
+# Command line entry point: python batch.py [--type movie|tv] [--dry-run] [--restart] [--workers N] [--json]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download posters for every folder that doesn't have one yet.")
+    parser.add_argument('--type', choices=['movie', 'tv'], default='movie', help="Library to fill (default: movie)")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be downloaded without saving")
+    parser.add_argument('--restart', action='store_true', help="Ignore progress from a previous run")
+    parser.add_argument('--workers', type=int, help="Number of titles processed concurrently")
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    import app  # Loads configuration, the TMDb client and the library index
+
+    if args.workers:
+        app.missing_poster_filler.workers = args.workers
+    app.library_scanner.scan_now()
+    report = app.fill_missing_posters(args.type, dry_run=args.dry_run, restart=args.restart)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for result in report['results']:
+        detail = result['tmdb_title'] or result['error'] or ''
+        print(f"{result['status']:<11} {result['title']}  {detail}")
+    print(f"\n{report['total']} missing, {report['processed']} processed this run: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(report['counts'].items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+End-to-end benchmark of Postarr's hot paths against a synthetic library and a local TMDb stub.
+
+Builds (or reuses) a library with make_library.py, points the app at tmdb_stub.py,
+optionally slows the library down with slowfs.py to imitate SMB, and reports p50/p99
+latency and throughput for the scan, index, TV, poster serving, search, selection,
+directory matching and poster saving paths.
+
+    python benchmarks/bench_app.py --size 10k --smb-latency 0.002 --tmdb-latency 0.05
+    python benchmarks/bench_app.py --json > baseline.json
+    python benchmarks/bench_app.py --baseline baseline.json    # exits 1 when a path got slower
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from make_library import SIZES, build_library  # noqa: E402
+from slack_stub import SlackStub  # noqa: E402
+from slowfs import SlowFS  # noqa: E402
+from tmdb_stub import TMDbStub  # noqa: E402
+
+
+# Function to pick the nearest-rank percentile from a list of timings
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Bench:
+    """
+    Runs named workloads and collects their timings.
+    """
+
+    def __init__(self, concurrency=1):
+        self.concurrency = concurrency
+        self.results = {}
+
+    def run(self, name, func, items, concurrency=None):
+        """
+        Call func(item) for every item (on `concurrency` threads) and record the latencies.
+        """
+        items = list(items)
+        if not items:
+            return
+        timings = []
+        lock = threading.Lock()
+
+        def timed(item):
+            started = time.perf_counter()
+            func(item)
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency or self.concurrency) as pool:
+            list(pool.map(timed, items))
+        wall = time.perf_counter() - started
+
+        self.results[name] = {
+            'n': len(timings),
+            'p50_ms': percentile(timings, 0.50) * 1000,
+            'p99_ms': percentile(timings, 0.99) * 1000,
+            'throughput': len(timings) / wall if wall else 0.0,
+        }
+        self.print_row(name, self.results[name])
+
+    @staticmethod
+    def print_row(name, result):
+        print(f"{name:<16} n={result['n']:<6} p50 {result['p50_ms']:9.2f} ms   p99 {result['p99_ms']:9.2f} ms   "
+              f"{result['throughput']:9.1f}/s", file=sys.stderr)
+
+
+def tmdb_style(name):
+    # What TMDb would call a folder: no year, ':' instead of ' - '
+    return re.sub(r'\s*\(\d{4}\)$', '', name).replace(' - ', ': ')
+
+
+def check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}")
+    return response
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return the paths whose p50 got more than `tolerance` (and at least 1 ms) slower than the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['p50_ms'] > before['p50_ms'] * (1 + tolerance) and result['p50_ms'] - before['p50_ms'] > 1:
+            regressions.append(f"{name}: p50 {before['p50_ms']:.2f} ms -> {result['p50_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='1k', help="Library size (default: 1k)")
+    parser.add_argument('--workdir', help="Where libraries are built and kept between runs (default: temp dir)")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per path (default: 200)")
+    parser.add_argument('--saves', type=int, default=20, help="Posters saved in the save benchmark (default: 20)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients (default: 4)")
+    parser.add_argument('--smb-latency', type=float, default=0.0, help="Seconds added to each library file call")
+    parser.add_argument('--smb-blocking-rate', type=float, default=0.0, help="Share of calls raising BlockingIOError")
+    parser.add_argument('--tmdb-latency', type=float, default=0.0, help="Seconds added to each TMDb stub response")
+    parser.add_argument('--thumb-cache', choices=['disk', 'memory', 'off'], default='disk')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p50 slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='postarr-bench-')
+    library = os.path.join(workdir, f"library-{args.size}-{args.seed}")
+    if not os.path.isdir(os.path.join(library, 'movies')):
+        print(f"Building {args.size} library in {library} ...", file=sys.stderr)
+        build_library(library, SIZES[args.size], seed=args.seed)
+    data_dir = tempfile.mkdtemp(prefix='data-', dir=workdir)
+
+    stub = TMDbStub(latency=args.tmdb_latency).start()
+    slack = SlackStub().start()
+    os.environ.update({
+        'MOVIE_FOLDERS': os.path.join(library, 'movies'),
+        'TV_FOLDERS': os.path.join(library, 'tv'),
+        'POSTARR_DATA_DIR': data_dir,
+        'TMDB_API_KEY': 'benchmark',
+        'TMDB_BASE_URL': f"{stub.url}/3",
+        'TMDB_POSTER_BASE_URL': f"{stub.url}/t/p/original",
+        'TMDB_RATE_LIMIT': '0',
+        'THUMB_CACHE': args.thumb_cache,
+        'SCAN_INTERVAL': '86400',
+        'SCAN_USE_INOTIFY': 'false',
+        'SLACK_WEBHOOK_URL': slack.url,
+        'SLACK_BATCH_WINDOW': '1',
+    })
+
+    slowfs = SlowFS([library], latency=args.smb_latency, blocking_rate=args.smb_blocking_rate)
+    with contextlib.ExitStack() as stack:
+        if args.smb_latency or args.smb_blocking_rate:
+            stack.enter_context(slowfs)
+
+        import app  # Reads the environment above
+
+        client = app.app.test_client()
+        bench = Bench(args.concurrency)
+
+        # Library scans: a cold index (every folder probed), then warm reconciles
+        bench.run('scan_cold', lambda _: app.library_scanner.scan_now(force=True), [0], concurrency=1)
+        bench.run('scan_warm', lambda _: app.library_scanner.scan_now(), range(3), concurrency=1)
+        scans = app.library_scanner.scans_completed
+        app.library_scanner.start()
+        while app.library_scanner.scans_completed <= scans:
+            time.sleep(0.05)  # Let the background scanner's first pass finish before timing requests
+
+        snapshot = app.library_scanner.get_snapshot()
+        movies = list(snapshot.get('movies'))
+        n = args.requests
+
+        bench.run('index', lambda _: check(client.get('/')), range(n))
+        bench.run('tv', lambda _: check(client.get('/tv')), range(n))
+        words = sorted({word for entry in movies for word in entry['title'].lower().split()[:1]})
+        bench.run('api_filter', lambda word: check(client.get(f"/api/movies?q={urllib.parse.quote(word)}")),
+                  (rng.choice(words) for _ in range(n)))
+
+        # Poster serving: first access per thumbnail, repeat access, and browser revalidation
+        thumbs = [entry['poster_thumb'] for entry in movies if entry['poster_thumb']]
+        sample = rng.sample(thumbs, min(n, len(thumbs)))
+        etags = {}
+
+        def serve(url):
+            etags[url] = check(client.get(url)).headers.get('ETag')
+
+        bench.run('poster_cold', serve, sample)
+        bench.run('poster_warm', serve, sample)
+        bench.run('poster_304', lambda url: client.get(url, headers={'If-None-Match': etags[url] or ''}), sample)
+
+        # TMDb-backed pages: unique queries miss the response cache, repeats hit it
+        queries = [tmdb_style(entry['title']) for entry in rng.sample(movies, min(n, len(movies)))]
+        bench.run('search', lambda q: check(client.get(f"/search_movie?query={urllib.parse.quote(q)}")), queries)
+        bench.run('search_cached', lambda q: check(client.get(f"/search_movie?query={urllib.parse.quote(q)}")),
+                  queries)
+        bench.run('select', lambda i: check(client.get(f"/select_movie/{100000 + i}")), range(n))
+
+        # select_poster's title -> folder matching
+        matcher_titles = [tmdb_style(entry['title']) for entry in rng.sample(movies, min(n, len(movies)))]
+        bench.run('match', lambda title: app.get_directory_matcher('movie').match(title), matcher_titles)
+
+        # Full poster saves: download from the stub, thumbnails, atomic swap and index refresh.
+        # They go to scratch folders next to the library so a kept library stays unchanged between runs
+        scratch = os.path.join(workdir, 'save-scratch')
+        targets = []
+        for entry in rng.sample(movies, min(args.saves, len(movies))):
+            targets.append(os.path.join(scratch, entry['title']))
+            os.makedirs(targets[-1], exist_ok=True)
+
+        def save(save_dir):
+            with contextlib.redirect_stdout(io.StringIO()):
+                title = os.path.basename(save_dir)
+                if not app.save_poster_and_thumbnail(f"{stub.url}/t/p/original/bench.jpg", title, save_dir):
+                    raise RuntimeError(f"Saving a poster for {title} failed")
+
+        bench.run('save', save, targets, concurrency=1)
+
+        # Bulk saves through the job queue: each one queues a Slack notification that gets batched
+        with contextlib.redirect_stdout(io.StringIO()):
+            jobs = [app.job_queue.submit(save_dir, 'benchmark', app.save_poster_job,
+                                         f"{stub.url}/t/p/original/bench.jpg", os.path.basename(save_dir), save_dir)
+                    for save_dir in targets]
+            for job in jobs:
+                while app.job_queue.get(job.id).active:
+                    time.sleep(0.01)
+            app.slack_notifier.close()
+
+    stub.stop()
+    slack.stop()
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if slowfs.calls:
+        print(f"slowfs: {slowfs.calls} delayed calls, {slowfs.blocked} BlockingIOErrors", file=sys.stderr)
+    print(f"TMDb stub requests: {stub.requests}", file=sys.stderr)
+    print(f"Slack stub: {len(slack.payloads)} messages for {sum(len(p['attachments']) for p in slack.payloads)} posters",
+          file=sys.stderr)
+    if args.json:
+        print(json.dumps(bench.results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(bench.results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark the indexed DirectoryMatcher against the original select_poster matching loop.
+
+Builds a synthetic library of folder names, derives TMDb-style titles from them
+(punctuation changes, missing year, small typos) and reports latency and how often
+each approach picks the right folder, picks a wrong one (the poster would overwrite
+another title's) or finds nothing (the directory picker is shown). The indexed
+matcher trades some automatic matches for never guessing between same-named
+folders; "indexed+year" passes the release year, as select_poster does.
+
+    python benchmarks/bench_matcher.py --dirs 5000 --queries 300
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher, get_close_matches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import DirectoryMatcher, extract_year  # noqa: E402
+
+WORDS = ("dark night return empire star war lord ring king lion batman superman dawn justice alien "
+         "matrix toy story finding nemo back future jurassic park mission impossible fast furious "
+         "harry potter stone chamber secret prisoner goblet fire order phoenix prince deathly hallows "
+         "pirate caribbean curse black pearl man chest world end stranger tide spider home far way").split()
+
+
+# Copy of the matching loop select_poster used before the index existed
+def legacy_match(media_title, directories, threshold=0.8):
+    normalized_media_title = re.sub(r'[^a-z0-9]+', '', media_title.lower())
+    best_similarity = 0
+    best_match_dir = None
+    for directory in directories:
+        similarity = SequenceMatcher(None, normalized_media_title, re.sub(r'[^a-z0-9]+', '', directory.lower())).ratio()
+        if similarity > best_similarity:
+            best_similarity = similarity
+            best_match_dir = directory
+        if directory == media_title:
+            return directory
+    if best_similarity >= threshold:
+        return best_match_dir
+    get_close_matches(media_title, directories, n=5, cutoff=0.5)  # Suggestions were computed on a miss
+    return None
+
+
+def make_library(count, rng):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(1, 4))
+        title = ' '.join(word.capitalize() for word in words)
+        if rng.random() < 0.2:
+            title = title.replace(' ', ' - ', 1)
+        names.add(f"{title} ({rng.randint(1950, 2024)})")
+    return sorted(names)
+
+
+def tmdb_style(name, rng):
+    # What TMDb would send back for a folder: no year, ':' for ' - ', the odd typo
+    title = re.sub(r'\s*\(\d{4}\)$', '', name).replace(' - ', ': ')
+    if rng.random() < 0.2 and len(title) > 6:
+        i = rng.randrange(len(title) - 1)
+        title = title[:i] + title[i + 1] + title[i] + title[i + 2:]
+    return title
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    directories = make_library(args.dirs, rng)
+    targets = rng.sample(directories, args.queries)
+    queries = [(tmdb_style(name, rng), name) for name in targets]
+
+    started = time.perf_counter()
+    matcher = DirectoryMatcher([(name, name) for name in directories])
+    build_time = time.perf_counter() - started
+
+    def indexed(query, expected, year=None):
+        match = matcher.match(query, year=year)
+        return match.name if match else None
+
+    for label, func in (('legacy', lambda q, expected: legacy_match(q, directories)),
+                        ('indexed', indexed),
+                        ('indexed+year', lambda q, expected: indexed(q, expected, extract_year(expected)))):
+        timings = []
+        right = wrong = unmatched = 0
+        for query, expected in queries:
+            started = time.perf_counter()
+            found = func(query, expected)
+            timings.append(time.perf_counter() - started)
+            if found is None:
+                unmatched += 1
+            elif found == expected:
+                right += 1
+            else:
+                wrong += 1
+        timings.sort()
+        print(f"{label:>12}: p50 {statistics.median(timings) * 1000:8.2f} ms  "
+              f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:8.2f} ms  "
+              f"right {right}/{len(queries)}  wrong {wrong}  unmatched {unmatched}")
+
+    print(f"index build: {build_time * 1000:.1f} ms for {len(directories)} directories")
+
+
+if __name__ == '__main__':
+    main()
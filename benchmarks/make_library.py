@@ -0,0 +1,107 @@
+"""
+Build a synthetic Postarr media library for benchmarks.
+
+Creates movie and TV folders named like real ones ("Title (Year)") with a mix of
+poster.jpg / poster.jpeg / poster.png files, some folders without a poster and some
+posters without thumbnails, so the index, scanner and thumbnail paths all get work.
+
+    python benchmarks/make_library.py /tmp/postarr-bench --size 10k
+"""
+import argparse
+import io
+import os
+import random
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_matcher import WORDS  # noqa: E402
+
+# Named library sizes (number of movie folders; TV gets a fifth of that)
+SIZES = {'1k': 1000, '10k': 10000, '50k': 50000}
+
+# Share of folders per poster layout
+POSTER_MIX = (
+    ('poster.jpg', 0.55),
+    ('poster.jpeg', 0.10),
+    ('poster.png', 0.10),
+    (None, 0.25),  # No poster yet
+)
+THUMB_RATE = 0.7  # Share of posters that already have poster-thumb.jpg
+
+
+# Function to encode a small placeholder image with a real header (so dimension reads work)
+def encode_image(fmt, size=(200, 300), color=(90, 40, 120)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def folder_names(count, rng):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(1, 4))
+        title = ' '.join(word.capitalize() for word in words)
+        if rng.random() < 0.2:
+            title = title.replace(' ', ' - ', 1)
+        names.add(f"{title} ({rng.randint(1950, 2024)})")
+    return sorted(names)
+
+
+def build_library(root, movies, tv=None, seed=1):
+    """
+    Create <root>/movies and <root>/tv. Returns {'movies': path, 'tv': path, 'posters': n, 'thumbs': n}.
+    """
+    rng = random.Random(seed)
+    tv = movies // 5 if tv is None else tv
+    images = {
+        'poster.jpg': encode_image('JPEG'),
+        'poster.jpeg': encode_image('JPEG'),
+        'poster.png': encode_image('PNG'),
+        'poster-thumb.jpg': encode_image('JPEG', (300, 450)),
+    }
+    layouts = [name for name, _ in POSTER_MIX]
+    weights = [weight for _, weight in POSTER_MIX]
+
+    stats = {'posters': 0, 'thumbs': 0}
+    for section, count in (('movies', movies), ('tv', tv)):
+        section_path = os.path.join(root, section)
+        os.makedirs(section_path, exist_ok=True)
+        stats[section] = section_path
+        for name in folder_names(count, rng):
+            media_path = os.path.join(section_path, name)
+            os.makedirs(media_path, exist_ok=True)
+            # A video file so folders look like the real thing
+            open(os.path.join(media_path, f"{name}.mkv"), 'wb').close()
+
+            poster = rng.choices(layouts, weights)[0]
+            if poster is None:
+                continue
+            with open(os.path.join(media_path, poster), 'wb') as f:
+                f.write(images[poster])
+            stats['posters'] += 1
+            if rng.random() < THUMB_RATE:
+                with open(os.path.join(media_path, 'poster-thumb.jpg'), 'wb') as f:
+                    f.write(images['poster-thumb.jpg'])
+                stats['thumbs'] += 1
+
+        # Synology system folders the scanner has to skip
+        os.makedirs(os.path.join(section_path, '@eaDir'), exist_ok=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help="Directory to create the library in")
+    parser.add_argument('--size', choices=sorted(SIZES), default='1k', help="Number of movie folders (default: 1k)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    stats = build_library(args.root, SIZES[args.size], seed=args.seed)
+    print(f"Library in {args.root}: {stats['posters']} posters, {stats['thumbs']} thumbnails")
+
+
+if __name__ == '__main__':
+    main()
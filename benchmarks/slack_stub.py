@@ -0,0 +1,86 @@
+"""
+Local stand-in for a Slack incoming webhook, for benchmarks and trying out notifications.
+
+Records every posted payload and answers 200, or fails the first `fail_first`
+requests with `fail_status` (e.g. 429 or 500) to exercise the dispatcher's retries.
+
+    python benchmarks/slack_stub.py --port 8766 --fail-first 2 --fail-status 500
+    SLACK_WEBHOOK_URL=http://127.0.0.1:8766/hook SLACK_BATCH_WINDOW=2 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SlackStub:
+    """
+    Threaded HTTP server imitating a Slack webhook. `payloads` holds the accepted messages in order.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_first=0, fail_status=500, verbose=False):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.verbose = verbose
+        self.payloads = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/hook"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='slack-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def handle(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        body = request.rfile.read(int(request.headers.get('Content-Length', 0)))
+        with self._lock:
+            self.requests += 1
+            failing = self.requests <= self.fail_first
+            if not failing:
+                self.payloads.append(json.loads(body))
+
+        status = self.fail_status if failing else 200
+        if self.verbose:
+            print(f"{status} {body.decode('utf-8')}")
+        request.send_response(status)
+        if status == 429:
+            request.send_header('Retry-After', '1')
+        request.send_header('Content-Type', 'text/plain')
+        request.end_headers()
+        request.wfile.write(b'ok' if status == 200 else b'error')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--fail-first', type=int, default=0, help="Number of requests to fail before accepting")
+    parser.add_argument('--fail-status', type=int, default=500, help="Status code for failed requests")
+    args = parser.parse_args()
+
+    stub = SlackStub(port=args.port, latency=args.latency, fail_first=args.fail_first,
+                     fail_status=args.fail_status, verbose=True)
+    print(f"Slack webhook stub listening on {stub.url}")
+    stub.server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
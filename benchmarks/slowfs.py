@@ -0,0 +1,74 @@
+"""
+Latency-injecting filesystem shim that makes a local directory behave more like an SMB mount.
+
+Wraps os.listdir, os.scandir, os.stat and open for paths under the given roots,
+adding a fixed delay (plus jitter) per call and optionally raising BlockingIOError
+at a given rate, the way a busy Synology share does. Only for benchmarks: it patches
+the running process.
+
+    from slowfs import SlowFS
+    with SlowFS(['/tmp/postarr-bench'], latency=0.002, blocking_rate=0.01):
+        ...
+"""
+import builtins
+import io
+import os
+import random
+import threading
+import time
+
+
+class SlowFS:
+    def __init__(self, roots, latency=0.002, jitter=0.5, blocking_rate=0.0, seed=1):
+        self.roots = tuple(os.path.abspath(root) + os.sep for root in roots)
+        self.latency = latency
+        self.jitter = jitter
+        self.blocking_rate = blocking_rate
+        self.calls = 0
+        self.blocked = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def _affected(self, path):
+        if isinstance(path, int):
+            return False
+        path = os.fspath(path)
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        return (os.path.abspath(path) + os.sep).startswith(self.roots)
+
+    def _delay(self, path):
+        if not self._affected(path):
+            return
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            blocked = self._rng.random() < self.blocking_rate
+            if blocked:
+                self.blocked += 1
+        time.sleep(delay)
+        if blocked:
+            raise BlockingIOError(11, 'Resource temporarily unavailable', path)
+
+    def _wrap(self, module, name):
+        original = getattr(module, name)
+        self._originals[(module, name)] = original
+
+        def wrapper(path=None, *args, **kwargs):
+            self._delay(path if path is not None else '.')
+            return original(path, *args, **kwargs) if path is not None else original(*args, **kwargs)
+
+        setattr(module, name, wrapper)
+
+    def __enter__(self):
+        for name in ('listdir', 'scandir', 'stat'):
+            self._wrap(os, name)
+        self._wrap(builtins, 'open')
+        self._wrap(io, 'open')
+        return self
+
+    def __exit__(self, *exc_info):
+        for (module, name), original in self._originals.items():
+            setattr(module, name, original)
+        self._originals.clear()
@@ -0,0 +1,137 @@
+"""
+Local stand-in for the TMDb API and image CDN, for benchmarks.
+
+Answers search, details and (season) image-list calls with made-up results and serves one
+generated poster for every image URL, with optional added latency per request.
+
+    python benchmarks/tmdb_stub.py --port 8765 --latency 0.05
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 TMDB_POSTER_BASE_URL=http://127.0.0.1:8765/t/p/original python app.py
+"""
+import argparse
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+
+# Function to derive a stable fake TMDb id from a string
+def fake_id(text):
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:6], 16)
+
+
+def make_poster(width=1000, height=1500):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (40, 60, 90)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class TMDbStub:
+    """
+    Threaded HTTP server imitating the TMDb endpoints Postarr uses.
+    `latency` seconds are added to every response; `requests` counts calls per kind.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, poster_size=(1000, 1500)):
+        self.latency = latency
+        self.poster = make_poster(*poster_size)
+        self.requests = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='tmdb-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def payload(self, path, params):
+        search = re.match(r'^/3/search/(movie|tv)$', path)
+        if search:
+            query = params.get('query', [''])[0]
+            key, date = ('title', 'release_date') if search.group(1) == 'movie' else ('name', 'first_air_date')
+            year = params.get('primary_release_year', params.get('first_air_date_year', ['2001']))[0]
+            return {'results': [{'id': fake_id(f"{query}{i}"), key: query if i == 0 else f"{query} {i + 1}",
+                                 date: f"{year}-01-01", 'poster_path': f"/{fake_id(query)}{i}.jpg", 'overview': ''}
+                                for i in range(5)]}
+
+        season = re.match(r'^/3/tv/(\d+)/season/(\d+)/images$', path)
+        if season:
+            languages = ['en', 'en', None, 'fr']
+            return {'posters': [{'file_path': f"/{season.group(1)}s{season.group(2)}p{i}.jpg", 'width': 1000 - i * 50,
+                                 'height': 1500 - i * 75, 'iso_639_1': language}
+                                for i, language in enumerate(languages)]}
+
+        images = re.match(r'^/3/(movie|tv)/(\d+)/images$', path)
+        if images:
+            languages = ['en'] * 8 + ['fr', 'de', None]
+            return {'posters': [{'file_path': f"/{images.group(2)}p{i}.jpg", 'width': 2000 - i * 100,
+                                 'height': 3000 - i * 150, 'iso_639_1': language}
+                                for i, language in enumerate(languages)]}
+
+        details = re.match(r'^/3/(movie|tv)/(\d+)$', path)
+        if details:
+            media_id = int(details.group(2))
+            return {'id': media_id, 'title': f"Movie {media_id}", 'name': f"Show {media_id}",
+                    'release_date': '2001-01-01', 'first_air_date': '2001-01-01',
+                    'seasons': [{'season_number': n} for n in range(1, 6)]}
+        return None
+
+    def handle(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urllib.parse.urlparse(request.path)
+
+        if parsed.path.startswith('/t/p/'):
+            self.count('image')
+            body, content_type = self.poster, 'image/jpeg'
+        else:
+            data = self.payload(parsed.path, urllib.parse.parse_qs(parsed.query))
+            if data is None:
+                request.send_response(404)
+                request.end_headers()
+                return
+            self.count('api')
+            body, content_type = json.dumps(data).encode('utf-8'), 'application/json'
+
+        request.send_response(200)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+
+    stub = TMDbStub(port=args.port, latency=args.latency)
+    print(f"TMDb stub listening on {stub.url} (API: {stub.url}/3, images: {stub.url}/t/p/original)")
+    stub.server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+import os
+import sqlite3
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from image_size import get_image_size  # Header-only image dimension reads
+from metrics import PROBE_SECONDS  # Directory probe timings
+from thumbnails import find_variants  # Thumbnail variant file names
+from seasons import find_seasons  # Season folders and season artwork
+
+# Synology NAS system folders that never contain media (compared case-insensitively)
+SKIP_DIRS = {"@eadir", "#recycle"}
+
+# Errors meaning a directory is really gone; anything else (BlockingIOError, EIO, timeouts) is the NAS struggling
+GONE_ERRORS = (FileNotFoundError, NotADirectoryError)
+
+# Image formats recognised for poster.* and poster-thumb.* files, in lookup order
+POSTER_EXTENSIONS = ['jpg', 'jpeg', 'png']
+
+# Schema for the persistent library index
+# - base_folders remembers the mtime of each configured library root
+# - media holds one row per title directory with everything the grid needs
+# - image_sizes caches poster dimensions keyed by path, mtime and file size
+# - meta holds the change generation other processes poll to notice updates
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS base_folders (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    base_folder TEXT NOT NULL,
+    media_dir TEXT NOT NULL,
+    dir_mtime REAL NOT NULL,
+    poster TEXT,
+    poster_thumb TEXT,
+    width INTEGER,
+    height INTEGER,
+    poster_mtime REAL,
+    thumb_variants TEXT,
+    seasons TEXT,
+    season_posters TEXT,
+    PRIMARY KEY (base_folder, media_dir)
+);
+CREATE TABLE IF NOT EXISTS image_sizes (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+# Function to probe a single media directory for poster files
+def probe_media_dir(media_path, image_size=lambda path, st: get_image_size(path)):
+    """
+    Look up poster and thumbnail files inside a media directory with a single scandir pass.
+    Returns a dict with the poster/thumb file names, dimensions and poster mtime, plus the
+    season folders and season posters (comma-separated season numbers) of TV shows.
+    `image_size(path, stat_result)` supplies poster dimensions and may answer from a cache.
+    """
+    poster = None
+    poster_thumb = None
+    width = None
+    height = None
+    poster_mtime = None
+
+    # One listing per directory instead of an exists() call per candidate file name
+    with os.scandir(media_path) as iterator:
+        entries = list(iterator)
+    files = {entry.name: entry for entry in entries if entry.name.startswith('poster')}
+    seasons, season_posters = find_seasons(entries)
+
+    # Sized JPEG/WebP/AVIF thumbnails available for content negotiation
+    thumb_variants = ','.join(find_variants(files))
+
+    for ext in POSTER_EXTENSIONS:
+        if poster_thumb is None and f"poster-thumb.{ext}" in files:
+            poster_thumb = f"poster-thumb.{ext}"
+
+        entry = files.get(f"poster.{ext}")
+        if entry is not None:
+            poster = entry.name
+
+            st = entry.stat()
+            poster_mtime = st.st_mtime
+
+            # Read poster dimensions; leave them empty if the image can't be parsed
+            try:
+                width, height = image_size(entry.path, st)
+            except Exception:
+                pass
+            break
+
+    return {
+        'poster': poster,
+        'poster_thumb': poster_thumb,
+        'width': width,
+        'height': height,
+        'poster_mtime': poster_mtime,
+        'thumb_variants': thumb_variants,
+        'seasons': ','.join(map(str, seasons)),
+        'season_posters': ','.join(map(str, season_posters)),
+    }
+
+
+class LibraryIndex:
+    """
+    Persistent SQLite index of media directories and their posters.
+
+    Each reconcile only re-probes directories whose mtime changed since the last
+    scan, so a warm index costs one stat per title instead of several existence
+    checks and an image open. Directory probes run on a bounded thread pool shared
+    by all base folders, which are themselves reconciled in parallel.
+    """
+
+    def __init__(self, db_path, listdir=os.listdir, probe_workers=8):
+        self.db_path = db_path
+        self.listdir = listdir
+        self.probe_workers = max(1, probe_workers)
+        self._probe_pool = ThreadPoolExecutor(max_workers=self.probe_workers, thread_name_prefix='probe')
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        # Poster dimensions keyed by path -> (mtime, size, width, height), persisted in image_sizes
+        # and loaded by the first probe that needs them (page loads from the index never do)
+        self._sizes = None
+        self._pending_sizes = {}
+        self._sizes_lock = threading.Lock()
+
+        # Make sure the directory holding the database exists before connecting
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        # Add columns introduced after the first release; their rows are re-probed on the next scan
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(media)")}
+        if 'thumb_variants' not in columns:
+            conn.execute("ALTER TABLE media ADD COLUMN thumb_variants TEXT")
+            conn.execute("UPDATE media SET dir_mtime = -1")
+        if 'seasons' not in columns:
+            conn.execute("ALTER TABLE media ADD COLUMN seasons TEXT")
+            conn.execute("ALTER TABLE media ADD COLUMN season_posters TEXT")
+            conn.execute("UPDATE media SET dir_mtime = -1")
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per operation keeps the index safe to use from any thread
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:  # Commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def image_size(self, path, st):
+        """
+        Return (width, height) for a poster, reading the file only if its mtime or size changed.
+        """
+        cached = self._load_sizes().get(path)
+        if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+            return cached[2], cached[3]
+
+        width, height = get_image_size(path)
+        with self._sizes_lock:
+            self._sizes[path] = self._pending_sizes[path] = (st.st_mtime, st.st_size, width, height)
+        return width, height
+
+    def _load_sizes(self):
+        if self._sizes is None:
+            with self._sizes_lock:
+                if self._sizes is None:
+                    with self._connect() as conn:
+                        self._sizes = {row['path']: (row['mtime'], row['size'], row['width'], row['height'])
+                                       for row in conn.execute("SELECT * FROM image_sizes")}
+        return self._sizes
+
+    def _flush_sizes(self, conn):
+        # Persist dimensions read since the last flush so they survive restarts
+        with self._sizes_lock:
+            pending, self._pending_sizes = self._pending_sizes, {}
+        if pending:
+            conn.executemany(
+                "INSERT OR REPLACE INTO image_sizes (path, mtime, size, width, height) VALUES (?, ?, ?, ?, ?)",
+                [(path, *values) for path, values in pending.items()])
+
+    def reconcile(self, base_folders, force=False):
+        """
+        Bring the index up to date for the given base folders and return their records.
+        With force=True every directory is re-probed regardless of its mtime.
+        """
+        if len(base_folders) <= 1:
+            results = [self._reconcile_base_folder(base_folder, force) for base_folder in base_folders]
+        else:
+            # Reconcile base folders in parallel; map() keeps the configured folder order
+            with ThreadPoolExecutor(max_workers=len(base_folders), thread_name_prefix='reconcile') as pool:
+                results = list(pool.map(lambda base_folder: self._reconcile_base_folder(base_folder, force),
+                                        base_folders))
+        return [record for records in results for record in records]
+
+    def _lock_for(self, base_folder):
+        # One lock per base folder so the same folder is never reconciled twice at once
+        with self._locks_guard:
+            return self._locks.setdefault(base_folder, threading.Lock())
+
+    def _check_media_dir(self, base_folder, media_dir, cached, force):
+        """
+        Stat a media directory and re-probe it if it changed.
+        Returns (record, changed), or None if the entry is gone or not a directory.
+        When the NAS fails to answer, returns (cached, None) so the last indexed record is kept.
+        """
+        media_path = os.path.join(base_folder, media_dir)
+        try:
+            st = os.stat(media_path)
+        except GONE_ERRORS:
+            return None
+        except OSError:
+            return cached, None
+        if not stat.S_ISDIR(st.st_mode):
+            return None
+
+        if not force and cached is not None and cached['dir_mtime'] == st.st_mtime:
+            return cached, False
+
+        # Directory is new or changed; probe it
+        record = {'base_folder': base_folder, 'media_dir': media_dir, 'dir_mtime': st.st_mtime}
+        try:
+            with PROBE_SECONDS.time():
+                record.update(probe_media_dir(media_path, self.image_size))
+        except GONE_ERRORS:
+            return None
+        except OSError:
+            return cached, None
+        return record, True
+
+    def _reconcile_base_folder(self, base_folder, force):
+        with self._lock_for(base_folder):
+            with self._connect() as conn:
+                known = {row['media_dir']: dict(row) for row in conn.execute(
+                    "SELECT * FROM media WHERE base_folder = ?", (base_folder,))}
+                row = conn.execute("SELECT mtime FROM base_folders WHERE path = ?", (base_folder,)).fetchone()
+
+            try:
+                base_mtime = os.stat(base_folder).st_mtime
+            except OSError:
+                # Base folder is unavailable; serve whatever we indexed last time
+                return [known[name] for name in sorted(known)]
+
+            # Only re-list the base folder when titles were added, removed or renamed
+            complete = True
+            if force or row is None or row['mtime'] != base_mtime or not known:
+                try:
+                    names = [name for name in self.listdir(base_folder) if name.lower() not in SKIP_DIRS]
+                except OSError:
+                    # The NAS didn't answer; check the titles we know and list again next scan
+                    names = list(known)
+                    complete = False
+            else:
+                names = list(known)
+
+            # Stat (and where needed probe) every directory on the shared pool; results keep sorted order.
+            # No transaction is open while the NAS is probed, so other writers never wait on a scan
+            names = sorted(names)
+            results = self._probe_pool.map(
+                lambda media_dir: self._check_media_dir(base_folder, media_dir, known.get(media_dir), force), names)
+
+            records = []
+            changed_records = []
+            seen = set()
+            for media_dir, result in zip(names, results):
+                if result is None:
+                    continue
+                record, changed = result
+                if changed is None:
+                    complete = False  # Couldn't check this one; keep what was indexed before
+                if record is None:
+                    continue
+                seen.add(media_dir)
+                if changed:
+                    changed_records.append(record)
+                records.append(record)
+
+            # Titles that no longer exist on disk
+            removed = [name for name in known if name not in seen]
+
+            # Write everything in one short transaction
+            with self._connect() as conn:
+                if changed_records or removed:
+                    # Rows updated meanwhile (e.g. refresh() after a poster save) are newer than this scan
+                    current = {r['media_dir']: r['dir_mtime'] for r in conn.execute(
+                        "SELECT media_dir, dir_mtime FROM media WHERE base_folder = ?", (base_folder,))}
+
+                    def untouched(name):
+                        return current.get(name) == (known[name]['dir_mtime'] if name in known else None)
+
+                    changed_records = [record for record in changed_records if untouched(record['media_dir'])]
+                    removed = [(base_folder, name) for name in removed if untouched(name)]
+                for record in changed_records:
+                    self._store(conn, record)
+                if removed:
+                    conn.executemany("DELETE FROM media WHERE base_folder = ? AND media_dir = ?", removed)
+                if removed or changed_records:
+                    self._bump_generation(conn)
+
+                self._flush_sizes(conn)
+                if complete:
+                    # Only remember the listing's mtime once every title in it was checked
+                    conn.execute("INSERT OR REPLACE INTO base_folders (path, mtime) VALUES (?, ?)",
+                                 (base_folder, base_mtime))
+
+        return records
+
+    def load(self, base_folders):
+        """
+        Return the indexed records for the given base folders without touching the filesystem.
+        """
+        records = []
+        with self._connect() as conn:
+            for base_folder in base_folders:
+                records.extend(dict(row) for row in conn.execute(
+                    "SELECT * FROM media WHERE base_folder = ? ORDER BY media_dir", (base_folder,)))
+        return records
+
+    def refresh(self, media_path):
+        """
+        Re-probe a single media directory and store the result.
+        """
+        base_folder, media_dir = os.path.split(os.path.normpath(media_path))
+        record = {'base_folder': base_folder, 'media_dir': media_dir, 'dir_mtime': os.stat(media_path).st_mtime}
+        with PROBE_SECONDS.time():
+            record.update(probe_media_dir(media_path, self.image_size))
+        with self._connect() as conn:
+            self._store(conn, record)
+            self._flush_sizes(conn)
+            self._bump_generation(conn)
+        return record
+
+    def _store(self, conn, record):
+        conn.execute(
+            "INSERT OR REPLACE INTO media (base_folder, media_dir, dir_mtime, poster, poster_thumb, "
+            "width, height, poster_mtime, thumb_variants, seasons, season_posters) VALUES (:base_folder, "
+            ":media_dir, :dir_mtime, :poster, :poster_thumb, :width, :height, :poster_mtime, :thumb_variants, "
+            ":seasons, :season_posters)",
+            record)
+
+    def _bump_generation(self, conn):
+        conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                     "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    def generation(self):
+        """
+        Return a counter that changes whenever indexed records change (in any process).
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row['value'] if row else 0
+
+    def invalidate(self, media_path):
+        """
+        Mark a single media directory as stale so the next reconcile re-probes it.
+        """
+        base_folder, media_dir = os.path.split(os.path.normpath(media_path))
+        with self._connect() as conn:
+            conn.execute("UPDATE media SET dir_mtime = -1 WHERE base_folder = ? AND media_dir = ?",
+                         (base_folder, media_dir))
@@ -0,0 +1,41 @@
+# Production server settings for: gunicorn -c gunicorn.conf.py app:app
+# Every value can be overridden with an environment variable.
+import os
+
+# Listen on all network interfaces at port 5000, like the development server
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Worker processes, each with a pool of request threads, so a slow SMB listing or
+# TMDb call only holds up one thread instead of the whole app
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '8'))
+
+# Seconds before a stuck worker is restarted; SMB hiccups can be slow to clear
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Log requests and errors to stdout/stderr for `docker logs`
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+# Load the app in each worker (not the master) so background threads and database
+# connections are created after the fork
+preload_app = False
+
+# Tell the app how many workers share the TMDb rate limit and the library index
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+
+# Start the background scanner as soon as a worker boots instead of on its first request
+# (and send the app's log messages through gunicorn's handlers and level)
+def post_worker_init(worker):
+    import logging
+    import app
+
+    gunicorn_logger = logging.getLogger('gunicorn.error')
+    app.app.logger.handlers = gunicorn_logger.handlers
+    app.app.logger.setLevel(gunicorn_logger.level)
+    app.library_scanner.start()
@@ -0,0 +1,85 @@
+import struct
+
+from metrics import IMAGE_SIZE_SECONDS  # Header read vs. PIL fallback timings
+
+# JPEG start-of-frame markers carry the image size (DHT/JPG/DAC share the range but don't)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+# Function to read width/height from a PNG IHDR chunk (first 24 bytes of the file)
+def _png_size(f):
+    header = f.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', header[16:24])
+    return width, height
+
+
+# Function to walk JPEG segments until the SOF marker, seeking past everything else
+def _jpeg_size(f):
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        # Markers may be padded with any number of 0xFF fill bytes
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # Standalone markers have no length field
+        if marker == 0xD9:
+            return None  # End of image without a frame header
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+
+        f.seek(length - 2, 1)
+
+
+def read_image_size(path):
+    """
+    Read (width, height) from the JPEG SOF or PNG IHDR header without decoding the image.
+    Returns None when the header can't be parsed.
+    """
+    with open(path, 'rb') as f:
+        signature = f.read(2)
+        f.seek(0)
+        if signature == b'\xff\xd8':
+            return _jpeg_size(f)
+        if signature == PNG_SIGNATURE[:2]:
+            return _png_size(f)
+    return None
+
+
+def get_image_size(path):
+    """
+    Return (width, height) for an image, reading only header bytes where possible.
+    Falls back to a full PIL open for formats the header parser doesn't understand.
+    """
+    try:
+        with IMAGE_SIZE_SECONDS.time(method='header'):
+            size = read_image_size(path)
+    except (OSError, struct.error):
+        size = None
+    if size is not None:
+        return size
+
+    from PIL import Image  # Only needed for the fallback path
+    with IMAGE_SIZE_SECONDS.time(method='pil'), Image.open(path) as img:
+        return img.width, img.height
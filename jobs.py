@@ -0,0 +1,274 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Job lifecycle states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Shared job table, so every web worker can report and deduplicate jobs started by another
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    description TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_key_status ON jobs (key, status);
+"""
+
+
+# Function to check whether a process is still running
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists but belongs to someone else
+    return True
+
+
+class Job:
+    """
+    A unit of background work and its status, as reported by /jobs/<id>.
+    """
+
+    def __init__(self, key, description):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.description = description
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.owner = os.getpid()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def from_row(cls, row):
+        job = cls.__new__(cls)
+        for name in ('id', 'key', 'description', 'status', 'error', 'owner', 'created_at', 'started_at',
+                     'finished_at'):
+            setattr(job, name, row[name])
+        job.result = json.loads(row['result']) if row['result'] is not None else None
+        return job
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'description': self.description,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobConflict(Exception):
+    """
+    Raised by submit_exclusive while a different job in the same group is still queued or running.
+    """
+
+    def __init__(self, job):
+        super().__init__(f"{job.description} is already in progress")
+        self.job = job
+
+
+class JobQueue:
+    """
+    Runs jobs on a worker pool and keeps their status for polling.
+
+    Jobs carry a deduplication key (e.g. the target directory): submitting work for
+    a key that already has a queued or running job returns that job instead of
+    starting a second one. Exclusive jobs also belong to a group (e.g. the poster of
+    one directory), in which only one key at a time may be active.
+
+    With a db_path, job status is also kept in SQLite so several web worker processes
+    share one view: any worker can answer /jobs/<id>, and deduplication spans workers.
+    Jobs still run in the process that accepted them; active jobs left behind by a
+    process that exited are marked failed. A job keeps blocking new submissions for its
+    key for as long as it runs (a bulk fill can take hours), however long that is.
+    """
+
+    def __init__(self, workers=2, history=200, logger=None, db_path=None):
+        self.history = history
+        self.logger = logger
+        self.db_path = db_path
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+                self._fail_orphans(conn)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _fail_orphans(self, conn):
+        # Jobs owned by a process that is gone (or by our own pid, which can't have jobs yet) never finish
+        for row in conn.execute("SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall():
+            if row['owner'] == os.getpid() or not pid_alive(row['owner']):
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                             (FAILED, 'Worker exited before the job finished', time.time(), row['id']))
+
+    def _save(self, job, conn=None):
+        if not self.db_path:
+            return
+        values = (job.id, job.key, job.description, job.status, json.dumps(job.result, default=str),
+                  job.error, job.owner, job.created_at, job.started_at, job.finished_at)
+        sql = ("INSERT OR REPLACE INTO jobs (id, key, description, status, result, error, owner, created_at, "
+               "started_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+        if conn is not None:
+            conn.execute(sql, values)
+            return
+        with self._connect() as conn:
+            conn.execute(sql, values)
+
+    def submit(self, key, description, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return its Job (or the already active job for this key).
+        """
+        return self._submit(key, None, description, func, args, kwargs)
+
+    def submit_exclusive(self, group, key, description, func, *args, **kwargs):
+        """
+        Like submit, for a job keyed f"{group}:{key}": the same key returns the active job, but while
+        a job for a different key in the group is active this raises JobConflict instead of queueing.
+        """
+        return self._submit(f"{group}:{key}", f"{group}:", description, func, args, kwargs)
+
+    def _submit(self, key, group, description, func, args, kwargs):
+        with self._lock:
+            existing = self._active_by_key.get(key)
+            if existing is not None and existing.active:
+                return existing
+            if group is not None:
+                for other_key, other in self._active_by_key.items():
+                    if other_key.startswith(group) and other.active:
+                        raise JobConflict(other)
+
+            job = Job(key, description)
+            if self.db_path:
+                # Check and claim the key in one write transaction so two workers can't both start it
+                with self._connect() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    existing = self._active_row(conn, "key = ?", (key,))
+                    if existing is not None:
+                        conn.execute("COMMIT")
+                        return existing
+                    if group is not None:
+                        existing = self._active_row(conn, "substr(key, 1, ?) = ?", (len(group), group))
+                        if existing is not None:
+                            conn.execute("COMMIT")
+                            raise JobConflict(existing)
+                    self._save(job, conn)
+                    conn.execute("COMMIT")
+
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            self._prune()
+
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _active_row(self, conn, where, params):
+        # The newest queued or running job matching `where`, however long it has been running, as long
+        # as the process that owns it is alive; jobs of processes that exited are marked failed
+        rows = conn.execute(f"SELECT * FROM jobs WHERE {where} AND status IN (?, ?) ORDER BY created_at DESC",
+                            (*params, QUEUED, RUNNING)).fetchall()
+        for row in rows:
+            if row['owner'] == os.getpid():
+                job = self._jobs.get(row['id'])  # Our own jobs are tracked in memory
+                if job is not None and job.active:
+                    return job
+            elif pid_alive(row['owner']):
+                return Job.from_row(row)
+            conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                         (FAILED, 'Worker exited before the job finished', time.time(), row['id']))
+        return None
+
+    def _run(self, job, func, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            job.result = func(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            if self.logger is not None:
+                self.logger.exception("Job %s (%s) failed: %s", job.id, job.description, e)
+        finally:
+            job.finished_at = time.time()
+            try:
+                self._save(job)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error("Could not record the result of job %s: %s", job.id, e)
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the history limit is reached
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN (?, ?) "
+                             "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (DONE, FAILED, self.history))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.db_path:
+            # Started by another worker process
+            with self._connect() as conn:
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            job = Job.from_row(row) if row is not None else None
+        return job
+
+    def list(self):
+        if self.db_path:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?",
+                                    (self.history,)).fetchall()
+            return [Job.from_row(row).to_dict() for row in rows]
+        with self._lock:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
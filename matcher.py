@@ -0,0 +1,125 @@
+import re
+import unicodedata
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher, get_close_matches
+
+# Result of a directory lookup; method is 'exact', 'normalized' or 'fuzzy'
+Match = namedtuple('Match', ['name', 'path', 'score', 'method'])
+
+# A release year in parentheses, e.g. "(2016)"
+YEAR_RE = re.compile(r'\(\s*(\d{4})\s*\)')
+
+
+# Function to extract the release year from a folder name, if present
+def extract_year(name):
+    match = YEAR_RE.search(name)
+    return int(match.group(1)) if match else None
+
+
+# Function to normalize a title or folder name for matching
+def normalize_name(name):
+    """
+    Lowercase, drop accents and the "(year)" suffix, spell out "&" and remove punctuation,
+    so "Batman v Superman - Dawn of Justice (2016)" and "Batman v Superman: Dawn of Justice"
+    normalize to the same key.
+    """
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    name = YEAR_RE.sub(' ', name).replace('&', ' and ')
+    return re.sub(r'[^a-z0-9]+', '', name)
+
+
+# Function to strip punctuation but keep everything else (the year included), as select_poster always did
+def loose_key(name):
+    return re.sub(r'[^a-z0-9]+', '', name.lower())
+
+
+# Function to split a normalized key into overlapping 3-character grams
+def trigrams(key):
+    if len(key) < 3:
+        return {key} if key else set()
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class DirectoryMatcher:
+    """
+    Prebuilt index for matching TMDb titles to media directory names.
+
+    Lookups go from cheapest to most expensive: exact folder name, then the normalized
+    key (hash lookups), then a trigram index that shortlists a handful of candidates
+    for full SequenceMatcher scoring instead of scoring every directory. Fuzzy scores
+    compare against the folder name with its year, like the original loop did, so
+    short titles and sequels ("Alien"/"Aliens") don't start matching each other.
+    """
+
+    def __init__(self, directories, shortlist_size=25):
+        # directories is a list of (folder name, full path) tuples
+        self.names = [name for name, _ in directories]
+        self.paths = [path for _, path in directories]
+        self.keys = [normalize_name(name) for name in self.names]
+        self.loose_keys = [loose_key(name) for name in self.names]
+        self.years = [extract_year(name) for name in self.names]
+        self.shortlist_size = shortlist_size
+
+        self._by_name = {}
+        self._by_key = {}
+        self._by_gram = {}
+        for i, (name, key) in enumerate(zip(self.names, self.keys)):
+            self._by_name.setdefault(name, []).append(i)
+            self._by_key.setdefault(key, []).append(i)
+            for gram in trigrams(key):
+                self._by_gram.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _pick(self, indexes, year):
+        # When several directories share a key only the year can tell them apart ("Dune (1984)"
+        # vs "Dune (2021)"); without a single directory for that year, leave it to the user
+        if len(indexes) == 1:
+            return indexes[0]
+        if year is not None:
+            candidates = [i for i in indexes if self.years[i] == year]
+            if len(candidates) == 1:
+                return candidates[0]
+        return None
+
+    def shortlist(self, key):
+        """
+        Return indexes of the directories sharing the most trigrams with a key.
+        """
+        grams = trigrams(key)
+        counts = Counter(i for gram in grams for i in self._by_gram.get(gram, ()))
+        return [i for i, _ in counts.most_common(self.shortlist_size)]
+
+    def match(self, title, year=None, threshold=0.8):
+        """
+        Return the best Match for a title, or None if nothing scores at least `threshold` or the
+        title fits several directories and `year` doesn't single one out.
+        """
+        year = year if year is not None else extract_year(title)
+        if title in self._by_name:
+            i = self._pick(self._by_name[title], year)
+            return Match(self.names[i], self.paths[i], 1.0, 'exact') if i is not None else None
+
+        key = normalize_name(title)
+        if key in self._by_key:
+            i = self._pick(self._by_key[key], year)
+            return Match(self.names[i], self.paths[i], 1.0, 'normalized') if i is not None else None
+
+        best = None
+        best_score = 0
+        title_key = loose_key(title)
+        for i in self.shortlist(key):
+            score = SequenceMatcher(None, title_key, self.loose_keys[i]).ratio()
+            if score > best_score:
+                best, best_score = i, score
+        if best is not None and best_score >= threshold:
+            return Match(self.names[best], self.paths[best], best_score, 'fuzzy')
+        return None
+
+    def suggestions(self, title, n=5, cutoff=0.5):
+        """
+        Return up to n folder names similar to a title, for the manual directory picker.
+        """
+        candidates = [self.names[i] for i in self.shortlist(normalize_name(title))]
+        return get_close_matches(title, candidates, n=n, cutoff=cutoff)
@@ -0,0 +1,265 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram buckets in seconds, from a warm local stat up to a stalled SMB mount
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Per-request timing totals for the Server-Timing header: {name: [seconds, count]}, or None outside a request
+request_timings = ContextVar('request_timings', default=None)
+_timings_lock = threading.Lock()  # Helper threads may add to the same request's totals
+
+
+# Function to format a label set the way Prometheus expects: {name="value",...}
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by labels.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(into, value):
+        return (into or 0) + value
+
+    def render(self, values):
+        for key, value in values:
+            yield f"{self.name}{format_labels(self.labels, key)} {value:g}"
+
+
+class Histogram:
+    """
+    Distribution of durations (or sizes), optionally split by labels.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, timing_name=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.timing_name = timing_name  # Reported in Server-Timing when set
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            # [per-bucket counts..., sum, count]
+            data = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+        timings = request_timings.get()
+        if self.timing_name is not None and timings is not None:
+            with _timings_lock:
+                total = timings.setdefault(self.timing_name, [0.0, 0])
+                total[0] += value
+                total[1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the with-block. Labels may be added to the yielded dict inside it.
+        """
+        started = time.perf_counter()
+        labels = dict(labels)
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(data)] for key, data in self._values.items()]
+
+    @staticmethod
+    def merge(into, value):
+        return value if into is None else [a + b for a, b in zip(into, value)]
+
+    def render(self, values):
+        for key, data in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(self.labels, key, [('le', f'{bound:g}')])} {cumulative}"
+            yield f"{self.name}_bucket{format_labels(self.labels, key, [('le', '+Inf')])} {data[-1]}"
+            yield f"{self.name}_sum{format_labels(self.labels, key)} {data[-2]:g}"
+            yield f"{self.name}_count{format_labels(self.labels, key)} {data[-1]}"
+
+
+class Registry:
+    """
+    Collection of metrics rendered in the Prometheus text format.
+
+    Each web worker process has its own registry. With a `directory`, every process
+    periodically writes a snapshot there, and /metrics adds up the snapshots of all
+    live processes so the numbers don't depend on which worker answered.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        return self.metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, timing_name=None):
+        return self.metrics.setdefault(name, Histogram(name, help, labels, buckets, timing_name))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        # Write this process's snapshot atomically so readers never see a partial file
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.metrics-', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def start_flushing(self, directory, interval=10):
+        """
+        Share this process's metrics through `directory`, refreshed every `interval` seconds.
+        """
+        with self._flusher_lock:
+            self.directory = directory
+            if self._flusher is not None:
+                return
+
+            def run():
+                while True:
+                    try:
+                        self.flush()
+                    except OSError:
+                        pass
+                    time.sleep(interval)
+
+            self._flusher = threading.Thread(target=run, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _snapshots(self):
+        yield self.snapshot()
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            pid, _, ext = name.partition('.')
+            if ext != 'json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                # Worker is gone; its counters go with it
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                continue
+            except OSError:
+                pass
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def render(self):
+        """
+        Return every metric, summed over all live processes, in the Prometheus text format.
+        """
+        merged = {name: {} for name in self.metrics}
+        for snapshot in self._snapshots():
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in values:
+                    key = tuple(key)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(sorted(merged[name].items())))
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry and the metrics recorded across the app
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'postarr_http_request_seconds', "Time spent handling HTTP requests", ['endpoint', 'method', 'status'])
+SMB_OPERATION_SECONDS = REGISTRY.histogram(
+    'postarr_smb_operation_seconds', "Time spent in NAS file operations, retries included", ['operation'],
+    timing_name='smb')
+SMB_RETRIES = REGISTRY.counter(
+    'postarr_smb_retries_total', "NAS operations retried after BlockingIOError", ['operation'])
+SMB_RETRY_SLEEP_SECONDS = REGISTRY.counter(
+    'postarr_smb_retry_sleep_seconds_total', "Time spent sleeping between NAS retries", ['operation'])
+SMB_BREAKER_TRIPS = REGISTRY.counter(
+    'postarr_smb_breaker_trips_total', "Times a NAS mount's circuit breaker opened", ['mount'])
+SMB_QUEUE_TIMEOUTS = REGISTRY.counter(
+    'postarr_smb_queue_timeouts_total', "NAS operations given up while waiting for a free I/O thread", ['operation'])
+SMB_STALE_LISTINGS = REGISTRY.counter(
+    'postarr_smb_stale_listings_total', "Directory listings answered from the last good listing", ['mount'])
+PROBE_SECONDS = REGISTRY.histogram(
+    'postarr_directory_probe_seconds', "Time spent probing a media directory for poster files", timing_name='probe')
+IMAGE_SIZE_SECONDS = REGISTRY.histogram(
+    'postarr_image_size_seconds', "Time spent reading poster dimensions", ['method'], timing_name='image')
+TMDB_REQUEST_SECONDS = REGISTRY.histogram(
+    'postarr_tmdb_request_seconds', "Time spent on TMDb HTTP requests (one observation per attempt)",
+    ['endpoint', 'status'], timing_name='tmdb')
+TMDB_RETRIES = REGISTRY.counter(
+    'postarr_tmdb_retries_total', "TMDb requests retried after errors, 429 or 5xx responses", ['endpoint'])
+TMDB_RATE_LIMIT_WAIT_SECONDS = REGISTRY.counter(
+    'postarr_tmdb_rate_limit_wait_seconds_total', "Time spent waiting for the TMDb rate limiter")
+TMDB_CACHE_RESULTS = REGISTRY.counter(
+    'postarr_tmdb_cache_results_total', "TMDb response cache lookups by outcome", ['result'])
+DOWNLOAD_SECONDS = REGISTRY.histogram(
+    'postarr_poster_download_seconds', "Time spent downloading a full-size poster", timing_name='download')
+DOWNLOAD_BYTES = REGISTRY.counter(
+    'postarr_poster_download_bytes_total', "Bytes of full-size posters downloaded")
+THUMBNAIL_SECONDS = REGISTRY.histogram(
+    'postarr_thumbnail_seconds', "Time spent generating the thumbnails for a poster", timing_name='thumbnails')
+SLACK_SECONDS = REGISTRY.histogram(
+    'postarr_slack_seconds', "Time spent posting Slack notifications", ['outcome'], timing_name='slack')
+SLACK_NOTIFICATIONS = REGISTRY.counter(
+    'postarr_slack_notifications_total', "Poster notifications delivered to or dropped by Slack", ['outcome'])
+THUMB_CACHE_RESULTS = REGISTRY.counter(
+    'postarr_thumbnail_cache_results_total', "Local thumbnail cache lookups by outcome", ['result'])
@@ -0,0 +1,147 @@
+import atexit
+import queue
+import threading
+import time
+
+from metrics import SLACK_SECONDS, SLACK_NOTIFICATIONS
+
+# Marker put on the queue to end the current batch early and stop the dispatcher
+_STOP = object()
+
+
+class SlackNotifier:
+    """
+    Background Slack dispatcher.
+
+    notify() only queues the event. A dispatcher thread collects events for `window`
+    seconds after the first one (or until `max_attachments` are waiting) and posts them
+    as a single message with one attachment each. Failed posts (errors, 429, 5xx) are
+    retried with exponential backoff, honouring Retry-After; other 4xx answers drop the batch.
+    """
+
+    def __init__(self, webhook_url, window=10.0, max_attachments=20, retries=5, backoff=2.0, timeout=10.0,
+                 session=None, logger=None):
+        self.webhook_url = webhook_url
+        self.window = window
+        self.max_attachments = max(1, max_attachments)
+        self.retries = max(1, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session  # A requests.Session is created by the dispatcher thread when not given
+        self.logger = logger
+        self.counts = {'queued': 0, 'sent': 0, 'dropped': 0, 'batches': 0}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)  # Don't lose queued notifications on shutdown
+
+    def notify(self, message, text=None, image_url=None):
+        """
+        Queue a notification; it is posted with whatever else arrives within the batching window.
+        """
+        with self._lock:
+            self.counts['queued'] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='slack-notifier', daemon=True)
+                self._thread.start()
+        self._queue.put({'message': message, 'text': text, 'image_url': image_url})
+
+    def _collect(self):
+        # Wait for the first event, then gather everything arriving within the window
+        event = self._queue.get()
+        if event is _STOP:
+            return None
+        batch = [event]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_attachments:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                self._queue.put(_STOP)  # Send this batch, then stop
+                break
+            batch.append(event)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._send(batch)
+
+    @staticmethod
+    def payload(batch):
+        """
+        Build the webhook payload: a single event keeps the one-poster message, several become one summary.
+        """
+        if len(batch) == 1:
+            text = batch[0]['message']
+        else:
+            text = f"{len(batch)} posters have been downloaded!"
+
+        attachments = []
+        for event in batch:
+            attachment = {'text': event['text'], 'image_url': event['image_url']}
+            if len(batch) > 1:
+                attachment['title'] = event['message']  # Say which title each poster belongs to
+            attachments.append({key: value for key, value in attachment.items() if value})
+        return {'text': text, 'attachments': attachments}
+
+    def _send(self, batch):
+        import requests
+
+        if self.session is None:
+            self.session = requests.Session()
+        payload = self.payload(batch)
+        for attempt in range(self.retries):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                with SLACK_SECONDS.time(outcome='error') as labels:
+                    response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+                    labels['outcome'] = 'sent' if response.status_code == 200 else 'failed'
+                if response.status_code == 200:
+                    self._record('sent', len(batch))
+                    print(f"Slack notification sent for {len(batch)} poster(s)")
+                    return True
+                if response.status_code != 429 and response.status_code < 500:
+                    print(f"Failed to send Slack notification. Status code: {response.status_code}")
+                    break
+                if response.headers.get('Retry-After', '').isdigit():
+                    delay = int(response.headers['Retry-After'])
+                error = f"status code {response.status_code}"
+            except requests.RequestException as e:
+                error = e
+            if attempt < self.retries - 1:
+                print(f"Error sending Slack notification ({error}); retrying in {delay:.0f}s")
+                time.sleep(delay)
+        self._record('dropped', len(batch))
+        if self.logger is not None:
+            self.logger.error(f"Dropped Slack notification for {len(batch)} poster(s)")
+        return False
+
+    def _record(self, outcome, count):
+        SLACK_NOTIFICATIONS.inc(count, outcome=outcome)
+        with self._lock:
+            self.counts[outcome] += count
+            self.counts['batches'] += 1
+
+    def close(self, timeout=5.0):
+        """
+        Post whatever is queued without waiting out the window, then stop the dispatcher.
+        """
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self.window = 0
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, 'pending': self._queue.qsize(), 'window': self.window}
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+# File locks coordinate scanning between web worker processes (POSIX only; elsewhere each process scans)
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+# inotify is optional; without it (or on mounts that don't deliver events, like SMB) we poll
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # pragma: no cover - depends on the platform
+    INotify = None
+    inotify_flags = None
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Immutable view of the media catalog published by the scanner.
+    `sections` maps a section name ('movies', 'tv') to a tuple of read-only entries, and
+    `fingerprints` maps it to a digest of its content that is equal in every process.
+    """
+    sections: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    fingerprints: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    version: int = 0
+    scanned_at: float = 0.0
+    duration: float = 0.0
+
+    def get(self, section):
+        return self.sections.get(section, ())
+
+
+# Digest of a section's entries (the default snapshot fingerprint)
+def content_digest(entries):
+    return hashlib.sha1(json.dumps(entries, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# Freeze a list of media dicts so request threads can share it without copying
+def freeze_entries(entries):
+    return tuple(MappingProxyType(dict(entry)) for entry in entries)
+
+
+class LibraryScanner:
+    """
+    Background service that keeps the media catalog hot.
+
+    `sections` maps a section name to a callable `build(revalidate, force)` returning
+    a list of media entries. The scanner reconciles every section on a schedule (or
+    sooner when inotify reports a change) and publishes the result as a Snapshot
+    that request handlers read without touching the filesystem. `fingerprint(entries)`
+    returns the content digest stored per section (e.g. to build HTTP ETags).
+
+    When several processes share one index (e.g. gunicorn workers), pass `lock_path`
+    and `changes`: only the process holding the leader lock scans the mounts, and
+    every process reloads its snapshot from the index whenever `changes()` (a token
+    that moves when the index is written) differs from the one it last loaded.
+    """
+
+    def __init__(self, sections, watch_folders=None, interval=300, concurrency=2, use_inotify=True, logger=None,
+                 lock_path=None, changes=None, follow_interval=5, fingerprint=None):
+        self.sections = dict(sections)
+        self.watch_folders = watch_folders or (lambda: [])
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.use_inotify = use_inotify and INotify is not None
+        self.logger = logger
+        self.lock_path = lock_path if fcntl is not None else None
+        self.changes = changes
+        self.follow_interval = follow_interval
+        self.fingerprint = fingerprint or content_digest
+        self._leader_file = None
+        self._seen_changes = None
+
+        self._snapshot = None
+        self._version = 0
+        self._publish_lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._force_requested = False
+        self._seen_rescan = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._inotify = None
+        self.mode = 'polling'
+        self.last_scan_duration = None
+        self.last_scan_at = None
+        self.last_error = None
+        self.scans_completed = 0
+
+    def _log(self, message):
+        if self.logger is not None:
+            self.logger.info(message)
+
+    def get_snapshot(self):
+        """
+        Return the current snapshot, building one synchronously only if none exists yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.load()
+            if not any(snapshot.sections.values()):
+                # Nothing persisted yet (first ever start); pay for one scan up front,
+                # unless another process finished one while we waited for the lock
+                with self._scan_lock, self._shared_scan_lock():
+                    snapshot = self.load()
+                    if not any(snapshot.sections.values()):
+                        snapshot = self._scan(force=False)
+        return snapshot
+
+    @contextmanager
+    def _shared_scan_lock(self):
+        # Serialize scans across processes sharing the index
+        if self.lock_path is None:
+            yield
+            return
+        with open(f"{self.lock_path}.scan", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def is_leader(self):
+        """
+        Return True if this process runs the background scans, taking over the leader lock if it's free.
+        """
+        if self.lock_path is None or self._leader_file is not None:
+            return True
+        lock_file = open(f"{self.lock_path}.leader", 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held (and the file kept open) for the lifetime of the process
+        self._leader_file = lock_file
+        self._log(f"Process {os.getpid()} is now the library scan leader")
+        return True
+
+    def _publish(self, sections, duration=0.0):
+        with self._publish_lock:
+            self._version += 1
+            self._snapshot = Snapshot(
+                sections=MappingProxyType({name: freeze_entries(entries) for name, entries in sections.items()}),
+                fingerprints=MappingProxyType({name: self.fingerprint(entries) for name, entries in sections.items()}),
+                version=self._version,
+                scanned_at=time.time(),
+                duration=duration,
+            )
+        return self._snapshot
+
+    def _read_changes(self):
+        return self.changes() if self.changes is not None else None
+
+    def load(self):
+        """
+        Publish a snapshot straight from the persisted index without touching the mounts.
+        """
+        seen = self._read_changes()
+        snapshot = self._publish({name: build(revalidate=False, force=False) for name, build in self.sections.items()})
+        self._seen_changes = seen
+        return snapshot
+
+    def preload(self):
+        """
+        Publish the persisted catalog, if there is one, so the first page doesn't wait for a scan.
+        Returns True when a snapshot is available.
+        """
+        if self._snapshot is not None:
+            return True
+        started = time.monotonic()
+        seen = self._read_changes()
+        sections = {name: build(revalidate=False, force=False) for name, build in self.sections.items()}
+        if not any(sections.values()):
+            return False  # First ever start; get_snapshot() or the first scan builds it
+        self._publish(sections)
+        self._seen_changes = seen
+        self._log(f"Loaded the persisted catalog in {time.monotonic() - started:.2f}s "
+                  f"({', '.join(f'{name}: {len(entries)}' for name, entries in sections.items())})")
+        return True
+
+    @property
+    def ready(self):
+        # A catalog (persisted or freshly scanned) is available to serve pages from
+        return self._snapshot is not None
+
+    def follow(self):
+        # Reload the snapshot if another process updated the index since we last looked
+        if self.changes is not None and self._read_changes() != self._seen_changes:
+            self.load()
+
+    def republish(self):
+        # Cheap rebuild after a targeted index update (e.g. a poster was just saved)
+        return self.load()
+
+    def scan_now(self, force=False):
+        """
+        Reconcile every section against the filesystem and publish the result.
+        """
+        with self._scan_lock, self._shared_scan_lock():
+            return self._scan(force)
+
+    def _scan(self, force):
+        started = time.monotonic()
+        # Taken before reconciling: anything written meanwhile (e.g. a poster save refreshing the index)
+        # may be newer than what this scan read, so follow() reloads it from the index afterwards
+        seen = self._read_changes()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='scan') as pool:
+            futures = {name: pool.submit(build, revalidate=True, force=force)
+                       for name, build in self.sections.items()}
+            sections = {name: future.result() for name, future in futures.items()}
+        duration = time.monotonic() - started
+
+        self.last_scan_duration = duration
+        self.last_scan_at = time.time()
+        self.scans_completed += 1
+        self._log(f"Library scan finished in {duration:.2f}s "
+                  f"({', '.join(f'{name}: {len(entries)}' for name, entries in sections.items())})")
+        snapshot = self._publish(sections, duration)
+        self._seen_changes = seen
+        return snapshot
+
+    def request_scan(self, force=False):
+        # Wake the background loop so it rescans without waiting for the interval;
+        # a forced rescan is also recorded on disk for the leader, which may be another process
+        if force:
+            self._force_requested = True
+            if self.lock_path is not None:
+                with open(f"{self.lock_path}.rescan", 'w') as f:
+                    f.write(f"{os.getpid()} {time.time()}\n")
+        self._wake.set()
+
+    def _rescan_token(self):
+        try:
+            return os.stat(f"{self.lock_path}.rescan").st_mtime_ns
+        except OSError:
+            return None
+
+    def _take_force_request(self):
+        # True once per forced rescan requested by this or another process
+        force, self._force_requested = self._force_requested, False
+        if self.lock_path is not None:
+            token = self._rescan_token()
+            if token != self._seen_rescan:
+                self._seen_rescan = token
+                force = True
+        return force
+
+    def start(self):
+        """
+        Start the background scan thread (and the inotify watcher when available).
+        """
+        with self._start_lock:
+            if self._threads:
+                return
+            self._start()
+
+    def _start(self):
+        scan_thread = threading.Thread(target=self._run, name='library-scanner', daemon=True)
+        self._threads.append(scan_thread)
+
+        if self.use_inotify:
+            try:
+                self._inotify = INotify()
+                self.mode = 'inotify'
+                watch_thread = threading.Thread(target=self._watch, name='library-watcher', daemon=True)
+                self._threads.append(watch_thread)
+            except OSError as e:
+                self._log(f"inotify unavailable, falling back to polling: {e}")
+                self._inotify = None
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        # The leader scans immediately on start, then every `interval` seconds or when woken;
+        # with a shared index every process also checks it for other processes' updates
+        next_scan = 0
+        wait = self.interval if self.changes is None else min(self.interval, self.follow_interval)
+        try:
+            # Serve the persisted catalog while the first scan runs
+            self.preload()
+        except Exception as e:
+            self.last_error = str(e)
+            if self.logger is not None:
+                self.logger.exception("Loading the persisted catalog failed: %s", e)
+        if self.lock_path is not None:
+            self._seen_rescan = self._rescan_token()  # Requests from before we started are already stale
+        while not self._stop.is_set():
+            woken = self._wake.is_set()
+            self._wake.clear()
+            try:
+                leader = self.is_leader()
+                force = leader and self._take_force_request()
+                if leader and (woken or force or time.monotonic() >= next_scan):
+                    next_scan = time.monotonic() + self.interval
+                    self.scan_now(force=force)
+                    self.last_error = None
+                    self._arm_watches()
+                else:
+                    self.follow()
+            except Exception as e:
+                self.last_error = str(e)
+                if self.logger is not None:
+                    self.logger.exception("Library scan failed: %s", e)
+
+            self._wake.wait(wait)
+
+    def _arm_watches(self):
+        # Watch each base folder and its title directories; new folders are picked up after every scan
+        if self._inotify is None:
+            return
+        mask = (inotify_flags.CREATE | inotify_flags.DELETE | inotify_flags.MOVED_FROM |
+                inotify_flags.MOVED_TO | inotify_flags.CLOSE_WRITE)
+        for base_folder in self.watch_folders():
+            try:
+                self._inotify.add_watch(base_folder, mask)
+                with os.scandir(base_folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            self._inotify.add_watch(entry.path, mask)
+            except OSError as e:
+                # Watch limit reached or the mount doesn't support inotify; polling still covers it
+                self._log(f"Could not watch {base_folder}: {e}")
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                events = self._inotify.read(timeout=1000, read_delay=500)  # Debounce bursts of events
+            except OSError:
+                break
+            if events:
+                self.request_scan()
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            'mode': self.mode,
+            'pid': os.getpid(),
+            'role': 'leader' if self.lock_path is None or self._leader_file is not None else 'follower',
+            'running': any(thread.is_alive() for thread in self._threads),
+            'interval': self.interval,
+            'concurrency': self.concurrency,
+            'last_scan_duration': self.last_scan_duration,
+            'last_scan_at': self.last_scan_at,
+            'last_error': self.last_error,
+            'ready': self.ready,
+            'scans_completed': self.scans_completed,
+            'snapshot_version': snapshot.version if snapshot else None,
+            'counts': {name: len(entries) for name, entries in snapshot.sections.items()} if snapshot else {},
+        }
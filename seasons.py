@@ -0,0 +1,114 @@
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from thumbnails import write_thumbnail
+
+# Season artwork lives in the show folder under the names Plex, Kodi and Jellyfin look for:
+# season01-poster.jpg ... and season-specials-poster.jpg for season 0
+SEASON_POSTER_RE = re.compile(r'^season(\d{2,}|-specials)-poster\.(jpg|jpeg|png)$', re.IGNORECASE)
+
+# Season folders inside a show folder, e.g. "Season 1", "Season 01", "S01", "Specials"
+SEASON_DIR_RE = re.compile(r'^(?:season|series|s)[ ._-]*(\d{1,4})$|^(specials)$', re.IGNORECASE)
+
+SEASON_POSTER_EXTENSIONS = ['jpg', 'jpeg', 'png']
+
+
+# Function to name a season's poster file
+def season_poster_name(season, ext='jpg'):
+    return f"season-specials-poster.{ext}" if season == 0 else f"season{season:02d}-poster.{ext}"
+
+
+# Function to name a season's thumbnail file (300px JPEG next to the poster)
+def season_thumb_name(season):
+    return season_poster_name(season, 'jpg').replace('-poster.jpg', '-poster-thumb.jpg')
+
+
+# Function to parse a season poster file name into its season number
+def parse_season_poster(name):
+    match = SEASON_POSTER_RE.match(name)
+    if match is None:
+        return None
+    return 0 if match.group(1).lower() == '-specials' else int(match.group(1))
+
+
+# Function to parse a season folder name into its season number
+def parse_season_dir(name):
+    match = SEASON_DIR_RE.match(name)
+    if match is None:
+        return None
+    return 0 if match.group(2) else int(match.group(1))
+
+
+def find_seasons(entries):
+    """
+    Look through a show folder's scandir entries for season folders and season poster files.
+    Returns (seasons, season_posters) as sorted lists of season numbers.
+    """
+    seasons = set()
+    season_posters = set()
+    for entry in entries:
+        season = parse_season_poster(entry.name)
+        if season is not None:
+            season_posters.add(season)
+            continue
+        # Only names that look like season folders cost an is_dir() check
+        season = parse_season_dir(entry.name)
+        if season is not None and entry.is_dir():
+            seasons.add(season)
+    return sorted(seasons), sorted(season_posters)
+
+
+def save_season_posters(download, choices, save_dir, workers=4):
+    """
+    Save one poster per season into a show folder.
+
+    `choices` maps season number -> poster URL and `download(url)` returns the image bytes.
+    Downloads run `workers` at a time, and each season's thumbnail is rendered as soon as
+    its download lands, so network and encoding work overlap instead of running season by
+    season. Each season's files are swapped in atomically; a failure leaves its old files alone.
+    Returns (saved, failed): {season: poster path} and {season: error message}.
+    """
+    def save(season, url):
+        temp_paths = []
+        try:
+            image_bytes = download(url)
+            fd, temp_poster_path = tempfile.mkstemp(prefix='.season-', suffix='.tmp', dir=save_dir)
+            temp_paths.append(temp_poster_path)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(image_bytes)
+            temp_thumb_path, thumb_path = write_thumbnail(image_bytes, save_dir, season_thumb_name(season))
+            temp_paths.append(temp_thumb_path)
+
+            poster_path = os.path.join(save_dir, season_poster_name(season))
+            os.replace(temp_poster_path, poster_path)
+            os.replace(temp_thumb_path, thumb_path)
+            temp_paths.clear()
+
+            # Drop the season's poster in other formats so players don't pick the old one
+            for ext in SEASON_POSTER_EXTENSIONS[1:]:
+                stale_path = os.path.join(save_dir, season_poster_name(season, ext))
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            return poster_path
+        finally:
+            for temp_path in temp_paths:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    saved = {}
+    failed = {}
+    if not choices:
+        return saved, failed
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(choices))), thread_name_prefix='season') as pool:
+        futures = {pool.submit(save, season, url): season for season, url in choices.items()}
+        for future in as_completed(futures):
+            season = futures[future]
+            try:
+                saved[season] = future.result()
+            except Exception as e:
+                failed[season] = str(e)
+    return dict(sorted(saved.items())), dict(sorted(failed.items()))
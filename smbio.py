@@ -0,0 +1,265 @@
+import contextvars
+import errno
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import (SMB_BREAKER_TRIPS, SMB_OPERATION_SECONDS, SMB_QUEUE_TIMEOUTS, SMB_RETRIES, SMB_RETRY_SLEEP_SECONDS,
+                     SMB_STALE_LISTINGS)
+
+# Errors that are answers about a path, not signs of an unhealthy mount
+NOT_MOUNT_ERRORS = (FileNotFoundError, NotADirectoryError, IsADirectoryError, PermissionError)
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class MountUnavailable(OSError):
+    """
+    Raised when a mount is failing (breaker open, timed out or out of retries) and no cached data can stand in.
+    """
+
+    def __init__(self, mount, reason):
+        super().__init__(errno.EAGAIN, f"{mount} is unavailable: {reason}")
+        self.mount = mount
+
+
+class CircuitBreaker:
+    """
+    Per-mount health: opens after `failure_threshold` consecutive failures, then lets a
+    single trial call through every `reset_timeout` seconds until one succeeds.
+    """
+
+    def __init__(self, mount, failure_threshold=5, reset_timeout=30):
+        self.mount = mount
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_success = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN  # Let one trial call through
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.last_success = time.time()
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                SMB_BREAKER_TRIPS.inc(mount=self.mount)
+                return True
+        return False
+
+    def release(self):
+        # A trial call was given up before it reached the mount; let the next call try instead
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def status(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures, 'last_error': self.last_error,
+                    'last_success': self.last_success}
+
+
+class NASClient:
+    """
+    File I/O layer for the NAS mounts.
+
+    Calls run on a small pool of dedicated I/O threads, which absorb BlockingIOError
+    retries; request threads only wait (up to `timeout` once a thread has picked the call
+    up, and up to `queue_timeout` before that) for the result and never sleep.
+    Each mount has a circuit breaker, so a failing share is skipped quickly instead of
+    tying up threads. Directory listings are cached: fresh ones are served as-is, stale
+    ones are served while a background refresh runs, and the last good listing stands
+    in while a mount is failing.
+    """
+
+    def __init__(self, mounts, io_threads=4, timeout=5.0, queue_timeout=30.0, retries=4, base_delay=0.05,
+                 failure_threshold=5, reset_timeout=30, listing_ttl=30, logger=None):
+        self.mounts = mounts  # Callable returning the configured base folders
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.retries = max(1, retries)
+        self.base_delay = base_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.listing_ttl = listing_ttl
+        self.logger = logger
+        self._pool = ThreadPoolExecutor(max_workers=max(1, io_threads), thread_name_prefix='smb-io')
+        self._breakers = {}
+        self._listings = {}  # path -> (names, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def mount_for(self, path):
+        # The configured base folder containing a path (the longest match), or its top-level directory
+        path = os.path.abspath(path)
+        matches = [mount for mount in self.mounts() if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep)]
+        if matches:
+            return max(matches, key=len)
+        parts = path.split(os.sep)
+        return os.sep.join(parts[:2]) or os.sep
+
+    def breaker(self, mount):
+        with self._lock:
+            breaker = self._breakers.get(mount)
+            if breaker is None:
+                breaker = self._breakers[mount] = CircuitBreaker(mount, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _attempt(self, operation, func, path):
+        # Runs on an I/O thread: retry BlockingIOError with exponential backoff
+        with SMB_OPERATION_SECONDS.time(operation=operation):
+            for attempt in range(self.retries):
+                try:
+                    return func(path)
+                except BlockingIOError:
+                    if attempt == self.retries - 1:
+                        raise
+                    delay = self.base_delay * (2 ** attempt)
+                    SMB_RETRIES.inc(operation=operation)
+                    SMB_RETRY_SLEEP_SECONDS.inc(delay, operation=operation)
+                    time.sleep(delay)
+
+    def call(self, operation, func, path, timeout=None):
+        """
+        Run func(path) on an I/O thread, guarded by the mount's circuit breaker.
+        Raises MountUnavailable when the mount is failing; errors about the path itself pass through.
+        """
+        mount = self.mount_for(path)
+        breaker = self.breaker(mount)
+        if not breaker.allow():
+            raise MountUnavailable(mount, 'circuit breaker open')
+
+        # Run in a copy of the caller's context so the time still shows up in its Server-Timing header
+        started = threading.Event()
+        context = contextvars.copy_context()
+
+        def run():
+            started.set()
+            return context.run(self._attempt, operation, func, path)
+
+        future = self._pool.submit(run)
+
+        # Waiting for a free I/O thread means the app is busy, not that the mount is failing,
+        # so it has its own limit and never counts against the breaker
+        if not started.wait(self.queue_timeout) and future.cancel():
+            breaker.release()
+            SMB_QUEUE_TIMEOUTS.inc(operation=operation)
+            raise MountUnavailable(mount, 'all NAS I/O threads busy')
+        try:
+            result = future.result(timeout=self.timeout if timeout is None else timeout)
+        except NOT_MOUNT_ERRORS:
+            breaker.record_success()  # The mount answered
+            raise
+        except (OSError, FutureTimeout) as e:
+            reason = 'timed out' if isinstance(e, FutureTimeout) else e
+            if breaker.record_failure(reason) and self.logger is not None:
+                self.logger.warning(f"NAS mount {mount} marked unavailable after repeated errors: {reason}")
+            raise MountUnavailable(mount, reason) from e
+        breaker.record_success()
+        return result
+
+    def listdir(self, path):
+        """
+        List a directory, answering from the cached listing when there is one: a listing older
+        than listing_ttl is served while a background refresh runs, and the last good listing
+        keeps being served while the mount is unavailable.
+        """
+        cached = self._listings.get(path)
+        if cached is not None:
+            names, fetched_at = cached
+            if time.monotonic() - fetched_at >= self.listing_ttl:
+                self._refresh_listing(path)  # Stale: serve it now, refresh in the background
+            return list(names)
+        return self.fetch_listing(path)
+
+    def fetch_listing(self, path):
+        """
+        List a directory on the mount (never from the cache) and remember the result.
+        """
+        names = self.call('listdir', os.listdir, path)
+        self._listings[path] = (tuple(names), time.monotonic())
+        return names
+
+    def _refresh_listing(self, path):
+        with self._lock:
+            if path in self._refreshing:
+                return
+            self._refreshing.add(path)
+
+        def refresh():
+            try:
+                self.fetch_listing(path)
+            except MountUnavailable:
+                SMB_STALE_LISTINGS.inc(mount=self.mount_for(path))
+            except OSError:
+                self._listings.pop(path, None)  # The directory itself is gone
+            finally:
+                with self._lock:
+                    self._refreshing.discard(path)
+
+        threading.Thread(target=refresh, name='smb-refresh', daemon=True).start()
+
+    def read(self, path):
+        return self.call('read', _read_file, path)
+
+    def open(self, path):
+        """
+        Open a file for reading on an I/O thread; the caller reads (or streams) and closes it.
+        """
+        return self.call('open', _open_file, path)
+
+    def stat(self, path):
+        return self.call('stat', os.stat, path)
+
+    def exists(self, path):
+        """
+        Like os.path.exists, but False (instead of blocking) when the mount is unavailable.
+        """
+        try:
+            self.stat(path)
+            return True
+        except OSError:
+            return False
+
+    def status(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'mounts': {mount: breaker.status() for mount, breaker in sorted(breakers.items())},
+            'cached_listings': len(self._listings),
+            'timeout': self.timeout,
+            'listing_ttl': self.listing_ttl,
+        }
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _open_file(path):
+    return open(path, 'rb')
@@ -0,0 +1,196 @@
+// Lazy-loading library grid shared by the movie and TV pages.
+// The first page is rendered by the server; further pages are fetched from the JSON API
+// (/api/movies or /api/tv) as the user scrolls, so first paint doesn't grow with the library.
+(function () {
+    const grid = document.querySelector('[data-library-api]');
+    if (!grid) {
+        return;
+    }
+
+    const apiUrl = grid.dataset.libraryApi;
+    const contentType = grid.dataset.contentType;
+    const sentinel = document.getElementById('loadMoreSentinel');
+    const status = document.getElementById('libraryStatus');
+    let nextCursor = grid.dataset.nextCursor || null;
+    let filters = {};
+    let loading = false;
+    let generation = 0; // Ignore responses that belong to a previous filter
+
+    // Build a grid card with the same markup as the server-rendered ones
+    function buildCard(item) {
+        const card = document.createElement('div');
+        card.className = 'movie-card';
+        card.id = item.clean_id;
+        card.dataset.title = item.title.toLowerCase();
+        card.dataset.hasPoster = String(item.has_poster);
+
+        const imageWrapper = document.createElement('div');
+        const src = item.poster_thumb || item.poster;
+        if (src) {
+            const img = document.createElement('img');
+            img.src = src;
+            if (item.poster_thumb && item.poster_srcset) {
+                // Let the browser pick a thumbnail width; the server picks the format
+                img.srcset = item.poster_srcset;
+                img.sizes = '(max-width: 768px) 50vw, 17vw';
+            }
+            img.alt = item.title;
+            img.className = 'movie-poster';
+            img.loading = 'lazy';
+            img.addEventListener('click', () => triggerSearch(item.title, contentType));
+            imageWrapper.appendChild(img);
+        } else {
+            // Placeholder for titles without posters
+            const placeholder = document.createElement('div');
+            placeholder.className = 'img-thumbnail bg-light d-flex align-items-center justify-content-center';
+            placeholder.style.height = '300px';
+            const label = document.createElement('span');
+            label.textContent = 'No Poster';
+            placeholder.appendChild(label);
+            imageWrapper.appendChild(placeholder);
+        }
+        card.appendChild(imageWrapper);
+
+        const heading = document.createElement('h5');
+        heading.className = 'mt-2 text-center';
+        heading.textContent = item.title;
+        heading.addEventListener('click', () => triggerSearch(item.title, contentType));
+        card.appendChild(heading);
+
+        const details = document.createElement('p');
+        details.className = 'text-center';
+        details.innerHTML = '<strong>Dimensions:</strong> <span></span> | <strong>Last Modified:</strong> <span></span>';
+        const values = details.querySelectorAll('span');
+        values[0].textContent = String(item.poster_dimensions);
+        values[1].textContent = String(item.poster_last_modified);
+        if (item.seasons && item.seasons.length) {
+            // TV shows: how many seasons already have artwork
+            const seasons = document.createElement('span');
+            seasons.innerHTML = '<br><strong>Season Posters:</strong> ';
+            seasons.appendChild(document.createTextNode(`${item.season_posters.length}/${item.seasons.length}`));
+            details.appendChild(seasons);
+        }
+        card.appendChild(details);
+
+        return card;
+    }
+
+    function updateStatus(total) {
+        if (status) {
+            status.textContent = `Showing ${grid.children.length} of ${total}`;
+        }
+    }
+
+    // Fetch the next page (or the first page when reset) and append it to the grid
+    async function loadPage(reset) {
+        if (loading && !reset) {
+            return;
+        }
+        if (!reset && !nextCursor) {
+            return;
+        }
+
+        const params = new URLSearchParams(filters);
+        if (!reset) {
+            params.set('cursor', nextCursor);
+        }
+        const requestGeneration = reset ? ++generation : generation;
+
+        loading = true;
+        try {
+            const response = await fetch(`${apiUrl}?${params.toString()}`);
+            const page = await response.json();
+            if (requestGeneration !== generation) {
+                return;
+            }
+            if (reset) {
+                grid.replaceChildren();
+            }
+            page.items.forEach(item => grid.appendChild(buildCard(item)));
+            nextCursor = page.next_cursor;
+            updateStatus(page.total);
+        } finally {
+            loading = false;
+        }
+
+        // Keep loading while the sentinel is still on screen (e.g. on very tall displays)
+        if (nextCursor && sentinel && sentinel.getBoundingClientRect().top < window.innerHeight) {
+            loadPage(false);
+        }
+    }
+
+    // Replace the active filters and reload the grid from the first page
+    function setFilters(newFilters) {
+        filters = Object.fromEntries(Object.entries(newFilters).filter(([, value]) => value));
+        nextCursor = null;
+        loadPage(true);
+    }
+
+    if (sentinel && 'IntersectionObserver' in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadPage(false);
+            }
+        }, { rootMargin: '800px' }).observe(sentinel);
+    }
+
+    // Jump to a title that isn't on the first page (e.g. after saving a poster)
+    const anchor = decodeURIComponent(window.location.hash.slice(1));
+    if (anchor && !document.getElementById(anchor)) {
+        filters = { anchor: anchor };
+        loadPage(true).then(() => {
+            filters = {};
+            const target = document.getElementById(anchor);
+            if (target) {
+                target.scrollIntoView();
+            }
+        });
+    }
+
+    // Show progress of a queued poster download (?job=<id>) and refresh its card when done
+    function showJobBanner(text, style) {
+        let banner = document.getElementById('jobBanner');
+        if (!banner) {
+            banner = document.createElement('div');
+            banner.id = 'jobBanner';
+            grid.parentNode.insertBefore(banner, grid);
+        }
+        banner.className = `alert alert-${style}`;
+        banner.textContent = text;
+    }
+
+    async function refreshCard(cleanId) {
+        const response = await fetch(`${apiUrl}?anchor=${encodeURIComponent(cleanId)}&limit=1`);
+        const page = await response.json();
+        const current = document.getElementById(cleanId);
+        if (current && page.items.length && page.items[0].clean_id === cleanId) {
+            current.replaceWith(buildCard(page.items[0]));
+        }
+    }
+
+    async function pollJob(jobId) {
+        const response = await fetch(`/jobs/${encodeURIComponent(jobId)}`);
+        if (!response.ok) {
+            return;
+        }
+        const job = await response.json();
+        if (job.status === 'queued' || job.status === 'running') {
+            showJobBanner(`${job.description}: downloading...`, 'info');
+            setTimeout(() => pollJob(jobId), 1000);
+        } else if (job.status === 'done') {
+            showJobBanner(`${job.description} has been saved.`, 'success');
+            if (anchor) {
+                refreshCard(anchor);
+            }
+        } else {
+            showJobBanner(`${job.description} failed: ${job.error}`, 'danger');
+        }
+    }
+
+    const jobId = new URLSearchParams(window.location.search).get('job');
+    if (jobId) {
+        pollJob(jobId);
+    }
+
+    window.PostarrLibrary = { setFilters: setFilters };
+})();
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+# Function to derive the cache key for a file at a given catalog version
+def cache_key(path, version):
+    return hashlib.sha1(f"{path}\0{version}".encode('utf-8')).hexdigest()
+
+
+class ThumbnailCache:
+    """
+    Byte-bounded LRU cache for thumbnail files, kept in memory or on local disk.
+
+    Entries are keyed by source path plus a version token (the directory mtime recorded
+    in the catalog), so a new poster automatically misses the cache and old copies age
+    out through LRU eviction. With a cache_dir, cached files survive restarts.
+
+    Several processes (gunicorn workers) may share one cache_dir: any of them serves a
+    file another one wrote, file mtimes record every process's accesses, and before
+    evicting the size and LRU order are re-read from the directory so the byte budget
+    holds for the directory as a whole. Eviction then goes down to `low_water` of the
+    budget, so the directory is re-read once per that much written rather than per put.
+    """
+
+    def __init__(self, max_bytes, cache_dir=None, low_water=0.9):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.low_water = low_water
+        self._entries = OrderedDict()  # key -> bytes (memory) or size (disk)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            with self._lock:
+                self._evict()
+
+    def _rescan(self):
+        # Rebuild the LRU order and size from the files on disk (oldest access first), which
+        # includes files written and accessed by other processes sharing the directory
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.startswith('.'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # Evicted by another process meanwhile
+                files.append((st.st_mtime, entry.name, st.st_size))
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._size = sum(size for _, _, size in files)
+
+    def _entry_size(self, value):
+        return value if isinstance(value, int) else len(value)
+
+    def _evict(self):
+        # Drop least recently used entries until we're back under the byte budget
+        # (for a shared directory, measured from the directory itself and down to the low-water mark)
+        target = self.max_bytes
+        if self.cache_dir:
+            if self._size <= self.max_bytes and self._entries:
+                return
+            self._rescan()
+            if self._size <= self.max_bytes:
+                return
+            target = self.max_bytes * self.low_water
+        while self._size > target and self._entries:
+            key, value = self._entries.popitem(last=False)
+            self._size -= self._entry_size(value)
+            self.counters['evictions'] += 1
+            if self.cache_dir:
+                try:
+                    os.remove(os.path.join(self.cache_dir, key))
+                except OSError:
+                    pass
+
+    def get(self, path, version):
+        """
+        Return the cached bytes for path at this version, or None.
+        """
+        key = cache_key(path, version)
+        if not self.cache_dir:
+            with self._lock:
+                value = self._entries.get(key)
+                if value is None:
+                    self.counters['misses'] += 1
+                    return None
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+            return value
+
+        # On disk the file itself is the source of truth: another process may have written or evicted it
+        cached_path = os.path.join(self.cache_dir, key)
+        try:
+            with open(cached_path, 'rb') as f:
+                data = f.read()
+            os.utime(cached_path)  # Record the access for every process's LRU order
+        except OSError:
+            with self._lock:
+                self.counters['misses'] += 1
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._size -= size
+            return None
+        with self._lock:
+            self.counters['hits'] += 1
+            if key not in self._entries:
+                self._size += len(data)
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+        return data
+
+    def put(self, path, version, data):
+        if len(data) > self.max_bytes:
+            return
+        key = cache_key(path, version)
+        if self.cache_dir:
+            # Write through a temp file so readers never see a partial thumbnail
+            fd, temp_path = tempfile.mkstemp(prefix='.', dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, os.path.join(self.cache_dir, key))
+            value = len(data)
+        else:
+            value = data
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self._entry_size(previous)
+            self._entries[key] = value
+            self._size += len(data)
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), bytes=self._size, max_bytes=self.max_bytes,
+                        backend='disk' if self.cache_dir else 'memory')
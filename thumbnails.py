@@ -0,0 +1,240 @@
+import argparse
+import io
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Thumbnail widths (2:3 posters) and formats generated for every poster
+# poster-thumb.jpg (300px JPEG) keeps its historical name for existing tools and libraries
+THUMB_WIDTHS = (150, 300, 600)
+DEFAULT_WIDTH = 300
+THUMB_RATIO = 2 / 3
+
+# Encoder settings per format; AVIF is only offered when Pillow was built with it
+FORMATS = {
+    'jpg': ('JPEG', {'quality': 90}),
+    'webp': ('WEBP', {'quality': 82, 'method': 4}),
+    'avif': ('AVIF', {'quality': 60}),
+}
+MIME_TYPES = {'jpg': 'image/jpeg', 'webp': 'image/webp', 'avif': 'image/avif'}
+
+# Variant file names look like poster-thumb-150.webp
+VARIANT_RE = re.compile(r'^poster-thumb-(\d+)\.(jpg|webp|avif)$')
+
+
+# Function to read the configured thumbnail formats (THUMB_FORMATS=jpg,webp[,avif])
+def configured_formats():
+    formats = [fmt.strip() for fmt in os.getenv('THUMB_FORMATS', 'jpg,webp').split(',') if fmt.strip() in FORMATS]
+    if 'avif' in formats:
+        from PIL import features
+        if not features.check('avif'):
+            formats.remove('avif')
+    if 'jpg' not in formats:
+        formats.insert(0, 'jpg')  # JPEG is always produced as the universal fallback
+    return formats
+
+
+# Function to name a thumbnail variant file
+def variant_name(width, fmt):
+    if width == DEFAULT_WIDTH and fmt == 'jpg':
+        return 'poster-thumb.jpg'
+    return f"poster-thumb-{width}.{fmt}"
+
+
+# Function to list the thumbnail variant files present in a directory listing
+def find_variants(names):
+    return sorted(name for name in names if name == 'poster-thumb.jpg' or VARIANT_RE.match(name))
+
+
+# Function to parse a variant file name into (width, format)
+def parse_variant(name):
+    if name == 'poster-thumb.jpg':
+        return DEFAULT_WIDTH, 'jpg'
+    match = VARIANT_RE.match(name)
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable read-only file over a bytes-like object. Unlike io.BytesIO it doesn't copy a
+    bytearray, so decoding a downloaded poster doesn't hold it in memory twice.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._view[self._pos:self._pos + len(b)]
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def crop_to_poster(img):
+    """
+    Center-crop an image to the 2:3 thumbnail ratio.
+    """
+    aspect_ratio = img.width / img.height
+    if aspect_ratio > THUMB_RATIO:
+        # Image is wider than desired ratio, crop the sides
+        new_width = int(img.height * THUMB_RATIO)
+        left = (img.width - new_width) // 2
+        return img.crop((left, 0, left + new_width, img.height))
+    # Image is taller than desired ratio, crop the top and bottom
+    new_height = int(img.width / THUMB_RATIO)
+    top = (img.height - new_height) // 2
+    return img.crop((0, top, img.width, top + new_height))
+
+
+def write_thumbnails(image_bytes, save_dir, formats=None):
+    """
+    Render every thumbnail size and format from the poster bytes (or bytearray) into temp files in save_dir.
+    Returns a list of (temp_path, final_path) pairs for the caller to move into place.
+    """
+    from PIL import Image  # Loaded on first use so importing the app (which only needs file names) stays fast
+
+    formats = formats or configured_formats()
+    largest = max(THUMB_WIDTHS)
+    written = []
+    try:
+        with BufferReader(image_bytes) as file, Image.open(file) as img:
+            # Decode JPEGs at reduced scale, just large enough for the biggest thumbnail
+            img.draft('RGB', (largest, int(largest / THUMB_RATIO)))
+            poster = crop_to_poster(img).convert('RGB')
+
+        for width in sorted(THUMB_WIDTHS, reverse=True):
+            # Resize with high-quality Lanczos resampling
+            resized = poster.resize((width, int(width / THUMB_RATIO)), Image.LANCZOS)
+            for fmt in formats:
+                encoder, options = FORMATS[fmt]
+                fd, temp_path = tempfile.mkstemp(prefix='.poster-thumb-', suffix='.tmp', dir=save_dir)
+                written.append((temp_path, os.path.join(save_dir, variant_name(width, fmt))))
+                with os.fdopen(fd, 'wb') as file:
+                    resized.save(file, encoder, **options)
+    except Exception:
+        for temp_path, _ in written:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        raise
+    return written
+
+
+def write_thumbnail(image_bytes, save_dir, final_name, width=DEFAULT_WIDTH):
+    """
+    Render a single JPEG thumbnail (e.g. for season artwork) into a temp file in save_dir.
+    Returns (temp_path, final_path) for the caller to move into place.
+    """
+    from PIL import Image  # Loaded on first use, as in write_thumbnails
+
+    encoder, options = FORMATS['jpg']
+    with BufferReader(image_bytes) as file, Image.open(file) as img:
+        img.draft('RGB', (width, int(width / THUMB_RATIO)))
+        thumb = crop_to_poster(img).convert('RGB').resize((width, int(width / THUMB_RATIO)), Image.LANCZOS)
+
+    fd, temp_path = tempfile.mkstemp(prefix='.season-thumb-', suffix='.tmp', dir=save_dir)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            thumb.save(file, encoder, **options)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, os.path.join(save_dir, final_name)
+
+
+def remove_stale_variants(save_dir, keep):
+    """
+    Delete thumbnail variants that weren't just written (e.g. a format that was switched off).
+    """
+    keep = {os.path.basename(path) for path in keep}
+    for name in find_variants(os.listdir(save_dir)):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(save_dir, name))
+            except OSError:
+                pass
+
+
+def backfill_directory(media_path, poster_name, formats, force=False):
+    """
+    Build missing thumbnail variants for an existing poster. Returns the number of files written.
+    """
+    wanted = {variant_name(width, fmt) for width in THUMB_WIDTHS for fmt in formats}
+    present = set(find_variants(os.listdir(media_path)))
+    if not force and wanted <= present:
+        return 0
+
+    with open(os.path.join(media_path, poster_name), 'rb') as f:
+        image_bytes = f.read()
+    written = write_thumbnails(image_bytes, media_path, formats)
+    count = 0
+    for temp_path, final_path in written:
+        # Existing thumbnails are kept unless regenerating was asked for
+        if force or os.path.basename(final_path) not in present:
+            os.replace(temp_path, final_path)
+            count += 1
+        else:
+            os.remove(temp_path)
+    return count
+
+
+# Command line entry point: python thumbnails.py [--workers N] [--force]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate thumbnail variants for existing posters.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes to use (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist")
+    args = parser.parse_args(argv)
+
+    import app  # Loads configuration and the library index
+
+    app.library_scanner.scan_now()
+    snapshot = app.library_scanner.get_snapshot()
+    formats = configured_formats()
+    work = []
+    for section in ('movies', 'tv'):
+        for entry in snapshot.get(section):
+            if entry['poster_file']:
+                # The file name as indexed; entry['poster'] is a versioned URL
+                media_path = os.path.join(entry['base_folder'], entry['title'])
+                work.append((media_path, entry['poster_file']))
+
+    done = failed = files = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(backfill_directory, media_path, poster_name, formats, args.force): media_path
+                   for media_path, poster_name in work}
+        for future in as_completed(futures):
+            try:
+                files += future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"Failed to build thumbnails for {futures[future]}: {e}")
+
+    # Pick up the new files in the index
+    app.library_scanner.scan_now(force=True)
+    print(f"{done} posters checked, {files} thumbnail files written, {failed} failed")
+
+
+if __name__ == '__main__':
+    main()
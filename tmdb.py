@@ -0,0 +1,327 @@
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from metrics import TMDB_CACHE_RESULTS, TMDB_RATE_LIMIT_WAIT_SECONDS, TMDB_REQUEST_SECONDS, TMDB_RETRIES
+
+# Default cache lifetimes in seconds per TMDb endpoint ({id} stands for any numeric id)
+# Search results change as TMDb adds titles; details and image lists are stable for a day
+DEFAULT_TTLS = {
+    '/search/movie': 3600,
+    '/search/tv': 3600,
+    '/movie/{id}': 86400,
+    '/movie/{id}/images': 86400,
+    '/tv/{id}': 86400,
+    '/tv/{id}/images': 86400,
+}
+DEFAULT_TTL = 3600
+
+# Response codes worth retrying: rate limited or a transient server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Schema for the optional on-disk response store
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at);
+"""
+
+# Expired responses are kept this long for revalidation (and as a fallback when TMDb is down)
+# before the on-disk store drops them; pruning runs at most every PRUNE_INTERVAL seconds
+STALE_GRACE = 7 * 86400
+PRUNE_INTERVAL = 3600
+
+
+# Function to map a request path onto its endpoint pattern for TTL lookups
+def endpoint_for(path):
+    return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+
+@dataclass
+class CacheEntry:
+    data: dict
+    etag: str = None
+    last_modified: str = None
+    expires_at: float = 0.0
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+
+class ResponseCache:
+    """
+    Two-tier cache for TMDb JSON responses: an in-memory LRU in front of an optional
+    SQLite store. Entries expire per endpoint TTL but keep their ETag/Last-Modified so
+    they can be revalidated with a conditional request instead of re-downloaded.
+    """
+
+    def __init__(self, max_entries=512, ttls=None, default_ttl=DEFAULT_TTL, db_path=None, stale_grace=STALE_GRACE,
+                 prune_interval=PRUNE_INTERVAL):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.db_path = db_path
+        self.stale_grace = stale_grace
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stale_served': 0, 'disk_hits': 0, 'pruned': 0}
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ttl_for(self, path):
+        return self.ttls.get(endpoint_for(path), self.default_ttl)
+
+    def count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+        TMDB_CACHE_RESULTS.inc(result=counter)
+
+    def get(self, key):
+        """
+        Return the cached entry for a key (fresh or stale), or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if not self.db_path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT data, etag, last_modified, expires_at FROM responses WHERE key = ?",
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+        self.count('disk_hits')
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, data, etag, last_modified, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(entry.data), entry.etag, entry.last_modified, entry.expires_at))
+            self._prune()
+
+    def _prune(self):
+        # Every distinct search and title gets a row; drop those expired for longer than the grace period
+        now = time.time()
+        with self._lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + self.prune_interval
+        with self._connect() as conn:
+            pruned = conn.execute("DELETE FROM responses WHERE expires_at < ?", (now - self.stale_grace,)).rowcount
+        if pruned:
+            with self._lock:
+                self.counters['pruned'] += pruned
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), max_entries=self.max_entries,
+                        disk=bool(self.db_path))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` calls per second with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Block until a token is available
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMDbClient:
+    """
+    Shared TMDb client: a pooled requests.Session with timeouts, retries with
+    exponential backoff, a token-bucket rate limit on API calls and an optional
+    ResponseCache. `get_many` issues independent API calls concurrently.
+    """
+
+    def __init__(self, api_key, base_url, cache=None, rate_limit=40, timeout=(5, 30), retries=3,
+                 backoff=0.5, pool_size=16, max_workers=8):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tmdb')
+
+    @property
+    def session(self):
+        # Reuse connections (and TLS sessions) across calls and threads. Created on first use,
+        # so importing the app doesn't pay for loading requests
+        if self._session is None:
+            import requests
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def request(self, method, url, rate_limited=True, **kwargs):
+        """
+        Send a request through the pooled session, retrying connection errors,
+        timeouts, 429 and 5xx responses with exponential backoff.
+        """
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+        # API calls are labelled by endpoint ('/movie/{id}'), everything else is an image download
+        endpoint = endpoint_for(url[len(self.base_url):]) if url.startswith(self.base_url) else 'image'
+        for attempt in range(self.retries + 1):
+            if attempt:
+                TMDB_RETRIES.inc(endpoint=endpoint)
+            if rate_limited and self.bucket is not None:
+                waited = time.perf_counter()
+                self.bucket.acquire()
+                TMDB_RATE_LIMIT_WAIT_SECONDS.inc(time.perf_counter() - waited)
+            try:
+                with TMDB_REQUEST_SECONDS.time(endpoint=endpoint, status='error') as labels:
+                    response = self.session.request(method, url, **kwargs)
+                    labels['status'] = response.status_code
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                # Honour Retry-After from TMDb's rate limiter when it's given in seconds
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else self.backoff * (2 ** attempt)
+                response.close()
+            time.sleep(delay)
+
+    def get(self, path, **params):
+        """
+        GET a TMDb endpoint (e.g. '/movie/603') and return the decoded JSON body.
+        """
+        import requests
+
+        if self.cache is None:
+            return self.request('GET', f"{self.base_url}{path}", params=dict(params, api_key=self.api_key)).json()
+
+        # The API key is left out of the cache key so rotating it doesn't empty the cache
+        key = path + '?' + '&'.join(f"{name}={params[name]}" for name in sorted(params))
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            self.cache.count('hits')
+            return entry.data
+
+        # Stale entries are revalidated with a conditional request
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        try:
+            response = self.request('GET', f"{self.base_url}{path}", params=dict(params, api_key=self.api_key),
+                                    headers=headers)
+        except requests.RequestException:
+            if entry is None:
+                raise
+            # TMDb is unreachable; an old answer beats an error page
+            self.cache.count('stale_served')
+            return entry.data
+
+        ttl = self.cache.ttl_for(path)
+        if response.status_code == 304 and entry is not None:
+            self.cache.count('revalidated')
+            entry = CacheEntry(entry.data, response.headers.get('ETag', entry.etag),
+                               response.headers.get('Last-Modified', entry.last_modified), time.time() + ttl)
+            self.cache.put(key, entry)
+            return entry.data
+
+        self.cache.count('misses')
+        data = response.json()
+        if response.status_code == 200:
+            self.cache.put(key, CacheEntry(data, response.headers.get('ETag'),
+                                           response.headers.get('Last-Modified'), time.time() + ttl))
+        return data
+
+    def get_many(self, calls):
+        """
+        Run several independent GETs concurrently.
+        `calls` is a list of (path, params) tuples; results come back in the same order.
+        """
+        # Each call runs in a copy of the caller's context so its timings count towards the request
+        futures = [self._pool.submit(contextvars.copy_context().run, self.get, path, **params)
+                   for path, params in calls]
+        return [future.result() for future in futures]
+
+    def download(self, url, **kwargs):
+        """
+        GET a file (e.g. a poster from the image CDN) through the pooled session.
+        Image downloads don't count against the API rate limit.
+        """
+        return self.request('GET', url, rate_limited=False, **kwargs)